@@ -0,0 +1,59 @@
+import numpy as np
+import pandas as pd
+
+
+def _codes(values):
+    """
+    Integer codes (-1 for missing) and labels for a categorical or plain column.
+    """
+    if isinstance(values.dtype, pd.CategoricalDtype):
+        return values.cat.codes.to_numpy().astype(np.int64), values.cat.categories
+    codes, labels = pd.factorize(values, sort=True)
+    return codes.astype(np.int64), labels
+
+
+def crosstab_counts(groups, values, weights=None):
+    """
+    Weighted (group x value) count matrix built with a single bincount.
+
+    Returns the matrix plus the group and value labels; rows with a missing
+    group or value are skipped.
+    """
+    group_codes, group_labels = _codes(groups)
+    value_codes, value_labels = _codes(values)
+    valid = (group_codes >= 0) & (value_codes >= 0)
+    weights = None if weights is None else np.asarray(weights, dtype=np.float64)[valid]
+    flat = group_codes[valid] * len(value_labels) + value_codes[valid]
+    counts = np.bincount(flat, weights=weights, minlength=len(group_labels) * len(value_labels))
+    return counts.reshape(len(group_labels), len(value_labels)), group_labels, value_labels
+
+
+def group_mode(groups, values, weights=None):
+    """
+    Most frequent value per group, ties going to the first category like Series.mode()[0].
+
+    Groups without any non-missing value map to None.
+    """
+    counts, group_labels, value_labels = crosstab_counts(groups, values, weights)
+    winners = np.asarray(value_labels, dtype=object)[counts.argmax(axis=1)] if len(value_labels) else \
+        np.full(len(group_labels), None, dtype=object)
+    winners[counts.sum(axis=1) == 0] = None
+    return pd.Series(winners, index=pd.Index(group_labels, name=groups.name), name=values.name)
+
+
+def status_counts(groups, statuses, weights=None):
+    """
+    One column of (weighted) counts per status value, indexed by group.
+    """
+    counts, group_labels, status_labels = crosstab_counts(groups, statuses, weights)
+    return pd.DataFrame(counts, index=pd.Index(group_labels, name=groups.name), columns=list(status_labels))
+
+
+def ratio(numerator, denominator, scale=100.0, decimals=2):
+    """
+    numerator / denominator * scale, with 0 where the denominator is 0.
+    """
+    numerator = np.asarray(numerator, dtype=np.float64)
+    denominator = np.asarray(denominator, dtype=np.float64)
+    out = np.divide(numerator, denominator, out=np.zeros_like(numerator), where=denominator != 0)
+    return np.round(out * scale, decimals)
@@ -0,0 +1,109 @@
+"""
+Headless end-to-end benchmark of streamlit_app.py driven through AppTest.
+
+Each dataset size runs in its own interpreter so the data layer reads a fresh
+BILLING_* configuration and peak memory is measured per size:
+
+    python benchmarks/bench_app.py --sizes 10000 100000
+    python benchmarks/bench_app.py --sizes 10000 --save-baseline
+"""
+import argparse
+import json
+import os
+import re
+import subprocess
+import sys
+
+from common import (
+    DEFAULT_BASELINE, DEFAULT_RESULTS, DEFAULT_SIZES, DEFAULT_TOLERANCE, REPO_ROOT,
+    dataset_env, load_json, merge_results, peak_rss_mb, report, save_json, timed,
+)
+
+APP_PATH = os.path.join(REPO_ROOT, "streamlit_app.py")
+
+
+def _slug(label):
+    return re.sub(r'[^a-z0-9]+', '_', label.lower()).strip('_')
+
+
+def _run(at):
+    elapsed, _ = timed(at.run)
+    if at.exception:
+        raise RuntimeError(at.exception[0].message)
+    return elapsed
+
+
+def measure_app(timeout):
+    """
+    Metrics for one app session against whatever dataset the environment configures.
+    """
+    from streamlit.testing.v1 import AppTest
+
+    at = AppTest.from_file(APP_PATH, default_timeout=timeout)
+    metrics = {'cold_start_s': _run(at)}
+    metrics['warm_rerun_s'] = _run(at)
+
+    carriers, months, month_range = at.multiselect[0], at.multiselect[1], at.select_slider[0]
+    filter_changes = [
+        lambda: carriers.set_value(carriers.options[:1]),
+        lambda: carriers.set_value(carriers.options[:3]),
+        lambda: month_range.set_range(month_range.options[0], month_range.options[len(month_range.options) // 2]),
+        lambda: months.set_value(months.options[:2]),
+        lambda: (carriers.set_value([]), months.set_value([]),
+                 month_range.set_range(month_range.options[0], month_range.options[-1])),
+    ]
+    latencies = []
+    for change in filter_changes:
+        change()
+        latencies.append(_run(at))
+    metrics['filter_change_mean_s'] = sum(latencies) / len(latencies)
+    metrics['filter_change_max_s'] = max(latencies)
+
+    # Tabs after the first are still uncached for the unfiltered view here
+    tabs = at.radio[0]
+    for tab in tabs.options:
+        tabs.set_value(tab)
+        metrics[f'tab_{_slug(tab)}_s'] = _run(at)
+
+    metrics['peak_rss_mb'] = peak_rss_mb()
+    return metrics
+
+
+def run_size(size, timeout):
+    env = {**os.environ, **dataset_env(size)}
+    completed = subprocess.run(
+        [sys.executable, os.path.abspath(__file__), "--child", "--timeout", str(timeout)],
+        env=env, capture_output=True, text=True, cwd=REPO_ROOT,
+    )
+    if completed.returncode != 0:
+        raise RuntimeError(f"benchmark at {size:,} invoices failed:\n{completed.stderr}")
+    return json.loads(completed.stdout.strip().splitlines()[-1])
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", type=int, nargs="+", default=DEFAULT_SIZES, help="Invoice counts to benchmark")
+    parser.add_argument("--timeout", type=float, default=1800, help="Per-run AppTest timeout in seconds")
+    parser.add_argument("--results", default=DEFAULT_RESULTS)
+    parser.add_argument("--baseline", default=DEFAULT_BASELINE)
+    parser.add_argument("--tolerance", type=float, default=DEFAULT_TOLERANCE)
+    parser.add_argument("--save-baseline", action="store_true", help="Store these results as the new baseline")
+    parser.add_argument("--child", action="store_true", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        print(json.dumps(measure_app(args.timeout)))
+        return 0
+
+    results = {str(size): run_size(size, args.timeout) for size in args.sizes}
+    merge_results(args.results, "app", results)
+    baseline = load_json(args.baseline)
+    ok = report("app", results, baseline, args.tolerance)
+    if args.save_baseline:
+        baseline.setdefault("app", {}).update(results)
+        save_json(args.baseline, baseline)
+    return 0 if ok else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,120 @@
+"""
+Micro-benchmarks for the data-path hot spots behind the dashboard:
+
+- invoice generation and normalization (the former generate_sample_data)
+- invoice-vs-usage reconciliation
+- settlement netting
+- cube and filter-index builds
+- the carrier summaries (the former create_summary_table groupbys)
+- the table window: paging, search and the Styler pass
+
+    python benchmarks/bench_micro.py --sizes 10000 100000
+"""
+import argparse
+import sys
+
+import numpy as np
+import pandas as pd
+
+from common import (
+    DEFAULT_BASELINE, DEFAULT_RESULTS, DEFAULT_TOLERANCE,
+    best_of, dataset_config, load_json, merge_results, report, save_json,
+)
+from aggregations import group_mode, ratio, status_counts
+from cube import build_reconciliation_cube, filter_cube, rollup
+from data_generator import generate_invoice_data, generate_usage_records, iter_invoice_chunks
+from filter_index import FilterIndex
+from kpis import compute_kpis
+from netting import SettlementNetting, settlement_ledger
+from normalize import concat_normalized, normalize_invoice_frame
+from reconciliation import reconcile_invoices
+from tables import _search_mask, page_positions
+
+DEFAULT_MICRO_SIZES = [10_000, 100_000, 1_000_000]
+
+STYLES = {'Settled': 'color: green; font-weight: bold;', 'Unsettled': 'color: red; font-weight: bold;'}
+
+
+def carrier_summary(cube):
+    """
+    The per-carrier summary shape shared by the dispute and settlement tabs.
+    """
+    summary = rollup(cube, 'Carrier Name', ['Disputed Amount (USD)', 'Invoice Count'])
+    counts = status_counts(cube['Carrier Name'], cube['Settlement Status'], weights=cube['Invoice Count'])
+    settled = counts.reindex(summary['Carrier Name'])['Settled'].to_numpy()
+    summary['Completion Rate'] = ratio(settled, summary['Invoice Count'])
+    summary['Dispute Type'] = group_mode(cube['Carrier Name'], cube['Dispute Type'],
+                                         weights=cube['Invoice Count']).reindex(summary['Carrier Name']).to_numpy()
+    return summary
+
+
+def styled_window(data, sort_column, page_size=50):
+    window = data.iloc[page_positions(data, sort_column, False, 0, page_size)]
+    styled = window.style.set_properties(**{'text-align': 'left'})
+    styled = styled.apply(lambda values: values.astype(object).map(STYLES).fillna(''), subset=['Settlement Status'])
+    return styled.to_html()
+
+
+def measure_micro(size, repeat):
+    config = dataset_config(size)
+    raw = generate_invoice_data(**config)
+    data = normalize_invoice_frame(raw)
+    usage = generate_usage_records(data)
+    cube = build_reconciliation_cube(data)
+    index = FilterIndex(data)
+    carriers = list(data['Carrier Name'].cat.categories[:3])
+    months = list(data['Invoice Month'].drop_duplicates().sort_values()[:6])
+    ledger = settlement_ledger(cube)
+
+    benchmarks = {
+        'generate_invoices_s': lambda: generate_invoice_data(**config),
+        'normalize_s': lambda: normalize_invoice_frame(raw),
+        'chunked_load_s': lambda: concat_normalized(normalize_invoice_frame(c) for c in iter_invoice_chunks(**config)),
+        'reconcile_s': lambda: reconcile_invoices(data, usage, max_workers=1),
+        'build_cube_s': lambda: build_reconciliation_cube(data),
+        'build_filter_index_s': lambda: FilterIndex(data),
+        'settlement_ledger_s': lambda: settlement_ledger(cube),
+        'settlement_netting_s': lambda: SettlementNetting(ledger).efficiency(),
+        'filter_select_s': lambda: index.select({'Carrier Name': carriers, 'Invoice Month': months}).frame(),
+        'filter_cube_s': lambda: filter_cube(cube, carriers, months),
+        'rollup_by_month_s': lambda: rollup(cube, 'Invoice Month'),
+        'carrier_summary_s': lambda: carrier_summary(cube),
+        'raw_groupby_summary_s': lambda: data.groupby('Carrier Name', observed=True).agg(
+            {'Disputed Amount (USD)': 'sum', 'Invoice Number': 'count'}),
+        'kpis_from_cube_s': lambda: compute_kpis(cube),
+        'table_page_sorted_s': lambda: page_positions(data, 'Invoice Amount (USD)', False, 0, 50),
+        'table_search_s': lambda: _search_mask(data, ['Invoice Number', 'Carrier Name'], '00042'),
+        'styler_window_s': lambda: styled_window(data, 'Invoice Amount (USD)'),
+        'styler_full_summary_s': lambda: carrier_summary(cube).style.apply(
+            lambda values: pd.Series('', index=values.index), subset=['Dispute Type']).to_html(),
+    }
+    results = {name: best_of(fn, repeat) for name, fn in benchmarks.items()}
+    results['memory_raw_mb'] = raw.memory_usage(deep=True).sum() / 1024 ** 2
+    results['memory_normalized_mb'] = data.memory_usage(deep=True).sum() / 1024 ** 2
+    results['cube_rows'] = float(len(cube))
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", type=int, nargs="+", default=DEFAULT_MICRO_SIZES, help="Invoice counts to benchmark")
+    parser.add_argument("--repeat", type=int, default=3, help="Timed calls per benchmark (fastest is kept)")
+    parser.add_argument("--results", default=DEFAULT_RESULTS)
+    parser.add_argument("--baseline", default=DEFAULT_BASELINE)
+    parser.add_argument("--tolerance", type=float, default=DEFAULT_TOLERANCE)
+    parser.add_argument("--save-baseline", action="store_true", help="Store these results as the new baseline")
+    args = parser.parse_args()
+
+    np.random.seed(0)
+    results = {str(size): measure_micro(size, args.repeat) for size in args.sizes}
+    merge_results(args.results, "micro", results)
+    baseline = load_json(args.baseline)
+    ok = report("micro", results, baseline, args.tolerance)
+    if args.save_baseline:
+        baseline.setdefault("micro", {}).update(results)
+        save_json(args.baseline, baseline)
+    return 0 if ok else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,95 @@
+"""
+Cold start of a fresh worker process: interpreter start to the end of the
+first script run (the first paint), with and without a dataset snapshot.
+
+For every size, one process builds the dataset and writes the snapshot,
+and a second one starts from that snapshot:
+
+    python benchmarks/bench_startup.py --sizes 10000 1000000
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import time
+
+from common import (
+    DEFAULT_BASELINE, DEFAULT_RESULTS, DEFAULT_TOLERANCE, REPO_ROOT,
+    dataset_env, load_json, merge_results, report, save_json, timed,
+)
+
+DEFAULT_STARTUP_SIZES = [10_000, 100_000, 1_000_000]
+
+APP_PATH = os.path.join(REPO_ROOT, "streamlit_app.py")
+
+
+def measure_first_run(timeout):
+    """
+    Import and first-run timings inside the child process.
+    """
+    import_s, _ = timed(__import__, "streamlit.testing.v1")
+    from streamlit.testing.v1 import AppTest
+
+    at = AppTest.from_file(APP_PATH, default_timeout=timeout)
+    first_run_s, _ = timed(at.run)
+    if at.exception:
+        raise RuntimeError(at.exception[0].message)
+    return {'import_streamlit_s': import_s, 'first_run_s': first_run_s}
+
+
+def run_process(size, timeout, snapshot_path):
+    env = {**os.environ, **dataset_env(size), "BILLING_SNAPSHOT_PATH": snapshot_path}
+    start = time.perf_counter()
+    completed = subprocess.run(
+        [sys.executable, os.path.abspath(__file__), "--child", "--timeout", str(timeout)],
+        env=env, capture_output=True, text=True, cwd=REPO_ROOT,
+    )
+    first_paint_s = time.perf_counter() - start
+    if completed.returncode != 0:
+        raise RuntimeError(f"startup at {size:,} invoices failed:\n{completed.stderr}")
+    metrics = json.loads(completed.stdout.strip().splitlines()[-1])
+    # Includes interpreter start and process exit, so it bounds time-to-first-paint from above
+    metrics['first_paint_s'] = first_paint_s
+    return metrics
+
+
+def measure_startup(size, timeout):
+    with tempfile.TemporaryDirectory() as tmp:
+        snapshot_path = os.path.join(tmp, "invoices.arrow")
+        build = run_process(size, timeout, snapshot_path)
+        snapshot = run_process(size, timeout, snapshot_path)
+    results = {f'build_{name}': value for name, value in build.items()}
+    results.update({f'snapshot_{name}': value for name, value in snapshot.items()})
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", type=int, nargs="+", default=DEFAULT_STARTUP_SIZES, help="Invoice counts to benchmark")
+    parser.add_argument("--timeout", type=float, default=1800, help="Per-run AppTest timeout in seconds")
+    parser.add_argument("--results", default=DEFAULT_RESULTS)
+    parser.add_argument("--baseline", default=DEFAULT_BASELINE)
+    parser.add_argument("--tolerance", type=float, default=DEFAULT_TOLERANCE)
+    parser.add_argument("--save-baseline", action="store_true", help="Store these results as the new baseline")
+    parser.add_argument("--child", action="store_true", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        print(json.dumps(measure_first_run(args.timeout)), flush=True)
+        # Skip interpreter teardown (AppTest can leave non-daemon threads behind)
+        os._exit(0)
+
+    results = {str(size): measure_startup(size, args.timeout) for size in args.sizes}
+    merge_results(args.results, "startup", results)
+    baseline = load_json(args.baseline)
+    ok = report("startup", results, baseline, args.tolerance)
+    if args.save_baseline:
+        baseline.setdefault("startup", {}).update(results)
+        save_json(args.baseline, baseline)
+    return 0 if ok else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
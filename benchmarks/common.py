@@ -0,0 +1,109 @@
+import json
+import math
+import os
+import resource
+import sys
+import time
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if REPO_ROOT not in sys.path:
+    sys.path.insert(0, REPO_ROOT)
+
+DEFAULT_SIZES = [10_000, 100_000, 1_000_000, 10_000_000]
+DEFAULT_RESULTS = os.path.join(REPO_ROOT, "benchmarks", "results.json")
+DEFAULT_BASELINE = os.path.join(REPO_ROOT, "benchmarks", "baseline.json")
+
+# A metric regresses when it exceeds baseline * (1 + tolerance)
+DEFAULT_TOLERANCE = 0.25
+
+
+def dataset_config(invoice_count, n_carriers=100, n_months=12):
+    """
+    Generator parameters giving roughly `invoice_count` invoices.
+    """
+    rows_per_carrier = max(1, math.ceil(invoice_count / (n_carriers * n_months)))
+    return {'n_carriers': n_carriers, 'n_months': n_months, 'rows_per_carrier': rows_per_carrier}
+
+
+def dataset_env(invoice_count, n_carriers=100, n_months=12):
+    """
+    Environment variables that make the data layer build a dataset of this size.
+    """
+    config = dataset_config(invoice_count, n_carriers, n_months)
+    return {
+        "BILLING_CARRIERS": str(config['n_carriers']),
+        "BILLING_MONTHS": str(config['n_months']),
+        "BILLING_ROWS_PER_CARRIER": str(config['rows_per_carrier']),
+    }
+
+
+def timed(fn, *args, **kwargs):
+    start = time.perf_counter()
+    result = fn(*args, **kwargs)
+    return time.perf_counter() - start, result
+
+
+def best_of(fn, repeat=3):
+    """
+    Fastest of `repeat` timed calls, in seconds.
+    """
+    return min(timed(fn)[0] for _ in range(repeat))
+
+
+def peak_rss_mb():
+    """
+    Peak resident set size of this process (ru_maxrss is KB on Linux, bytes on macOS).
+    """
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak / (1024 ** 2 if sys.platform == "darwin" else 1024)
+
+
+def load_json(path):
+    if not os.path.exists(path):
+        return {}
+    with open(path) as f:
+        return json.load(f)
+
+
+def save_json(path, data):
+    with open(path, "w") as f:
+        json.dump(data, f, indent=2, sort_keys=True)
+
+
+def merge_results(path, suite, results):
+    """
+    Store `results` ({size: {metric: value}}) under `suite` in the JSON file at `path`.
+    """
+    data = load_json(path)
+    data.setdefault(suite, {}).update(results)
+    save_json(path, data)
+    return data
+
+
+def find_regressions(suite, results, baseline, tolerance=DEFAULT_TOLERANCE):
+    """
+    (size, metric, baseline, current) for every metric slower or larger than the baseline allows.
+    """
+    regressions = []
+    for size, metrics in results.items():
+        reference = baseline.get(suite, {}).get(str(size), {})
+        for metric, value in metrics.items():
+            previous = reference.get(metric)
+            if previous and value > previous * (1 + tolerance):
+                regressions.append((size, metric, previous, value))
+    return regressions
+
+
+def report(suite, results, baseline, tolerance=DEFAULT_TOLERANCE):
+    """
+    Print results and regressions; return True when nothing regressed.
+    """
+    for size, metrics in results.items():
+        print(f"[{suite}] {int(size):,} invoices")
+        for metric, value in sorted(metrics.items()):
+            print(f"    {metric:<40} {value:10.4f}")
+    regressions = find_regressions(suite, results, baseline, tolerance)
+    for size, metric, previous, value in regressions:
+        print(f"REGRESSION [{suite}] {int(size):,} {metric}: {previous:.4f} -> {value:.4f} "
+              f"(+{(value / previous - 1) * 100:.0f}%)")
+    return not regressions
@@ -0,0 +1,215 @@
+import argparse
+import json
+import os
+
+import numpy as np
+import pandas as pd
+
+
+# Columns read from every CDR file; anything else in the file is skipped
+CDR_COLUMNS = ['Carrier Name', 'Call Start', 'Duration (Secs)', 'Charge (USD)']
+
+CDR_CHUNK_ROWS = 1_000_000
+
+# Write a checkpoint after this many chunks
+CHECKPOINT_EVERY = 10
+
+USAGE_COLUMNS = ['Carrier Name', 'Billing Cycle', 'Usage (Mins)', 'Rated Amount (USD)', 'Calls']
+
+
+def _cycle_ids(call_start):
+    """
+    Integer billing cycle per call, YYYYMMF (fortnight 1 = days 1-15, 2 = the rest).
+    """
+    fortnight = np.where(call_start.dt.day.to_numpy() > 15, 2, 1)
+    return call_start.dt.year.to_numpy() * 1000 + call_start.dt.month.to_numpy() * 10 + fortnight
+
+
+def _cycle_labels(cycle_ids):
+    cycle_ids = np.asarray(cycle_ids, dtype=np.int64)
+    return [f'{i // 1000:04d}-{i // 10 % 100:02d}-{i % 10}' for i in cycle_ids]
+
+
+def cycle_ids_from_labels(labels):
+    """
+    Billing cycle labels ('YYYY-MM-F') as the integer ids of _cycle_ids.
+    """
+    parts = pd.Series(labels, dtype=str).str.split('-', expand=True).astype(np.int64)
+    return (parts[0] * 1000 + parts[1] * 10 + parts[2]).to_numpy()
+
+
+def _iter_csv(path, chunk_rows, skip_rows):
+    reader = pd.read_csv(
+        path, usecols=CDR_COLUMNS, chunksize=chunk_rows, skiprows=range(1, skip_rows + 1),
+        dtype={'Carrier Name': 'category', 'Duration (Secs)': 'float64', 'Charge (USD)': 'float64'},
+    )
+    with reader:
+        yield from reader
+
+
+def _iter_parquet(path, chunk_rows, skip_rows):
+    import pyarrow.parquet as pq
+
+    parquet = pq.ParquetFile(path)
+    for batch in parquet.iter_batches(batch_size=chunk_rows, columns=CDR_COLUMNS):
+        if skip_rows >= batch.num_rows:
+            skip_rows -= batch.num_rows
+            continue
+        yield batch.slice(skip_rows).to_pandas()
+        skip_rows = 0
+
+
+def iter_cdr_chunks(path, chunk_rows=CDR_CHUNK_ROWS, skip_rows=0):
+    """
+    Yield a CDR file (.csv or .parquet) as DataFrames of at most `chunk_rows`
+    rows, starting after the first `skip_rows` records.
+    """
+    if path.endswith(('.parquet', '.pq')):
+        return _iter_parquet(path, chunk_rows, skip_rows)
+    return _iter_csv(path, chunk_rows, skip_rows)
+
+
+class UsageAggregator:
+    """
+    Running per-(carrier, billing cycle) totals of CDR minutes, charges and calls.
+
+    Totals grow with the number of carriers and cycles, not with the number
+    of records, so memory stays flat however many chunks are added.
+    """
+
+    def __init__(self, totals=None):
+        self.totals = totals if totals is not None else pd.DataFrame(
+            columns=['Minutes', 'Charges', 'Calls'], dtype='float64',
+            index=pd.MultiIndex.from_tuples([], names=['Carrier Name', 'Cycle']),
+        )
+
+    def update(self, chunk):
+        call_start = pd.to_datetime(chunk['Call Start'], format='ISO8601')
+        partial = pd.DataFrame({
+            'Carrier Name': chunk['Carrier Name'].astype(str).to_numpy(),
+            'Cycle': _cycle_ids(call_start),
+            'Minutes': chunk['Duration (Secs)'].to_numpy(dtype=np.float64) / 60,
+            'Charges': chunk['Charge (USD)'].to_numpy(dtype=np.float64),
+            'Calls': 1.0,
+        }).groupby(['Carrier Name', 'Cycle'], sort=False).sum()
+        self.totals = partial if self.totals.empty else self.totals.add(partial, fill_value=0)
+        return self
+
+    def usage(self, cycles=None):
+        """
+        Aggregated usage in the record layout reconcile_invoices expects,
+        optionally only for the billing cycles labelled `cycles`.
+        """
+        totals = self.totals
+        if cycles is not None:
+            totals = totals[totals.index.get_level_values('Cycle').isin(cycle_ids_from_labels(cycles))]
+        totals = totals.sort_index()
+        return pd.DataFrame({
+            'Carrier Name': totals.index.get_level_values('Carrier Name').astype(str),
+            'Billing Cycle': _cycle_labels(totals.index.get_level_values('Cycle')),
+            'Usage (Mins)': totals['Minutes'].to_numpy(),
+            'Rated Amount (USD)': np.round(totals['Charges'].to_numpy(), 2),
+            'Calls': totals['Calls'].to_numpy(dtype=np.int64),
+        }, columns=USAGE_COLUMNS)
+
+    def to_records(self):
+        return [[carrier, int(cycle), *values] for (carrier, cycle), values in
+                zip(self.totals.index, self.totals.to_numpy().tolist())]
+
+    @classmethod
+    def from_records(cls, records):
+        if not records:
+            return cls()
+        frame = pd.DataFrame(records, columns=['Carrier Name', 'Cycle', 'Minutes', 'Charges', 'Calls'])
+        return cls(frame.set_index(['Carrier Name', 'Cycle']).astype('float64'))
+
+
+class CdrIngest:
+    """
+    Incremental ingest of append-only CDR files into running usage totals.
+
+    Every file's size and the rows already counted are tracked, so update()
+    over a changed file list only reads what is new: files not seen before
+    and records appended to known files. If a file shrank (it was
+    rewritten) or one counted before is no longer listed, everything is
+    counted again from the start. With
+    `checkpoint_path` the progress is saved every `checkpoint_every` chunks
+    and at the end of each file, and picked up by the next instance.
+    """
+
+    def __init__(self, checkpoint_path=None, chunk_rows=CDR_CHUNK_ROWS, checkpoint_every=CHECKPOINT_EVERY):
+        self.checkpoint_path = checkpoint_path
+        self.chunk_rows = chunk_rows
+        self.checkpoint_every = checkpoint_every
+        self.files = {}
+        self.aggregator = UsageAggregator()
+        if checkpoint_path and os.path.exists(checkpoint_path):
+            with open(checkpoint_path) as f:
+                state = json.load(f)
+            if 'files' in state:  # older checkpoints are not incremental: start over
+                self.files = state['files']
+                self.aggregator = UsageAggregator.from_records(state['totals'])
+
+    def _save(self):
+        state = {'files': self.files, 'totals': self.aggregator.to_records()}
+        tmp_path = f"{self.checkpoint_path}.tmp"
+        with open(tmp_path, "w") as f:
+            json.dump(state, f)
+        os.replace(tmp_path, self.checkpoint_path)  # atomic, so a crash never leaves a torn checkpoint
+
+    def update(self, paths):
+        """
+        Count the records of `paths` not counted yet; returns self.
+        """
+        paths = [os.path.abspath(path) for path in ([paths] if isinstance(paths, str) else paths)]
+        sizes = {path: os.stat(path).st_size for path in paths}
+        shrunk = any(path in self.files and sizes[path] < self.files[path]['size'] for path in paths)
+        if shrunk or not set(self.files) <= set(sizes):
+            self.files, self.aggregator = {}, UsageAggregator()
+
+        for path in paths:
+            progress = self.files.setdefault(path, {'size': 0, 'rows_done': 0, 'complete': False})
+            if progress['complete'] and progress['size'] == sizes[path]:
+                continue
+            progress.update(size=sizes[path], complete=False)
+            skip_rows = progress['rows_done']
+            for chunk_number, chunk in enumerate(iter_cdr_chunks(path, self.chunk_rows, skip_rows), start=1):
+                self.aggregator.update(chunk)
+                progress['rows_done'] += len(chunk)
+                if self.checkpoint_path and chunk_number % self.checkpoint_every == 0:
+                    self._save()
+            progress['complete'] = True
+            if self.checkpoint_path:
+                self._save()
+        return self
+
+    def usage(self, cycles=None):
+        return self.aggregator.usage(cycles)
+
+
+def ingest_cdrs(paths, checkpoint_path=None, chunk_rows=CDR_CHUNK_ROWS, checkpoint_every=CHECKPOINT_EVERY):
+    """
+    Stream CDR files chunk by chunk into per-(carrier, billing cycle) usage.
+
+    Only one chunk is in memory at a time. With `checkpoint_path`, a rerun
+    resumes where the last one stopped and only reads new files and records
+    appended since (see CdrIngest). Returns the aggregated usage (see
+    UsageAggregator.usage).
+    """
+    return CdrIngest(checkpoint_path, chunk_rows, checkpoint_every).update(paths).usage()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Aggregate CDR files into per-carrier, per-billing-cycle usage.")
+    parser.add_argument("paths", nargs="+", help="CDR files (.csv or .parquet)")
+    parser.add_argument("--checkpoint", help="Checkpoint file for resumable runs")
+    parser.add_argument("--chunk-rows", type=int, default=CDR_CHUNK_ROWS)
+    parser.add_argument("--output", help="Write the aggregated usage here (.csv or .parquet)")
+    args = parser.parse_args()
+    usage = ingest_cdrs(args.paths, args.checkpoint, args.chunk_rows)
+    if args.output and args.output.endswith('.parquet'):
+        usage.to_parquet(args.output, index=False)
+    elif args.output:
+        usage.to_csv(args.output, index=False)
+    else:
+        print(usage.to_string(index=False))
@@ -0,0 +1,55 @@
+import pandas as pd
+import streamlit as st
+
+
+# Upper bounds on what a chart actually draws, whatever the data size
+TOP_N_CATEGORIES = 20
+MAX_TIME_POINTS = 60
+
+# Coarser period frequencies tried in turn when a time series has too many points
+TIME_BUCKETS = ['M', 'Q', 'Y']
+
+OTHER_LABEL = "Other"
+
+
+def top_n_with_other(data, category, value_columns, n=TOP_N_CATEGORIES, sort_by=None):
+    """
+    Keep the `n` largest categories by `sort_by` and fold the rest into one "Other" row.
+    """
+    sort_by = sort_by or value_columns[0]
+    data = data[[category] + value_columns]
+    if len(data) <= n:
+        return data
+    ranked = data.sort_values(sort_by, ascending=False)
+    top = ranked.head(n)
+    other = pd.DataFrame({category: [OTHER_LABEL], **{col: [ranked[col].iloc[n:].sum()] for col in value_columns}})
+    top = top.assign(**{category: top[category].astype(str)})
+    return pd.concat([top, other], ignore_index=True)
+
+
+def bucket_time_series(data, period_column, value_columns, max_points=MAX_TIME_POINTS):
+    """
+    Re-aggregate a Period-indexed series to the finest of TIME_BUCKETS that fits
+    in `max_points`, with string labels ready for plotting.
+    """
+    periods = data[period_column]
+    for freq in TIME_BUCKETS:
+        buckets = periods.dt.asfreq(freq) if freq != 'M' else periods
+        if buckets.nunique() <= max_points or freq == TIME_BUCKETS[-1]:
+            break
+    bucketed = data[value_columns].groupby(buckets.rename(period_column)).sum().reset_index()
+    bucketed[period_column] = bucketed[period_column].astype(str)
+    return bucketed
+
+
+def serialize_figure(fig):
+    """
+    Plotly JSON for a figure, so memoized chart results are cached as compact strings.
+    """
+    return fig.to_json()
+
+
+def plot_serialized(figure_json, **kwargs):
+    import plotly.io as pio  # deferred to the first chart, off the import path of the app
+
+    st.plotly_chart(pio.from_json(figure_json, skip_invalid=True), **kwargs)
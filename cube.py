@@ -0,0 +1,65 @@
+import pandas as pd
+
+from normalize import concat_normalized
+
+
+# One cube cell per combination of these invoice attributes
+CUBE_DIMENSIONS = [
+    'Carrier Name', 'Invoice Month', 'Billing Cycle',
+    'Reconciliation Status', 'Dispute Type', 'Settlement Status'
+]
+CUBE_MEASURES = ['Invoice Amount (USD)', 'Disputed Amount (USD)', 'Usage (Mins)', 'Disputed Usage (Mins)']
+CUBE_COUNTS = ['Invoice Count', 'Disputed Count']
+
+
+def build_reconciliation_cube(df):
+    """
+    Pre-aggregate raw invoices into sums and counts per CUBE_DIMENSIONS cell.
+
+    Undisputed invoices keep a missing 'Dispute Type' as their own cell.
+    """
+    grouped = df.groupby(CUBE_DIMENSIONS, observed=True, dropna=False, sort=False)
+    measures = [col for col in CUBE_MEASURES if col in df.columns]
+    cube = grouped[measures].sum().astype('float64')
+    cube['Invoice Count'] = grouped.size()
+    cube['Disputed Count'] = (df['Disputed Amount (USD)'] > 0).groupby(
+        [df[col] for col in CUBE_DIMENSIONS], observed=True, dropna=False, sort=False).sum()
+    return cube.reset_index()
+
+
+def append_to_cube(cube, rows):
+    """
+    Cube for the already aggregated invoices plus the new invoice `rows`.
+
+    Only cells of the billing cycles present in `rows` are re-aggregated;
+    cells of every other cycle are carried over untouched.
+    """
+    delta = build_reconciliation_cube(rows)
+    combined = concat_normalized([cube, delta]).reset_index(drop=True)
+    touched = combined['Billing Cycle'].isin(delta['Billing Cycle'].unique())
+    if not touched.iloc[:len(cube)].any():
+        return combined
+    values = [col for col in combined.columns if col not in CUBE_DIMENSIONS]
+    merged = combined[touched].groupby(CUBE_DIMENSIONS, observed=True, dropna=False, sort=False)[values].sum()
+    return pd.concat([combined[~touched], merged.reset_index()], ignore_index=True)
+
+
+def filter_cube(cube, carriers=None, months=None):
+    """
+    Restrict the cube to the selected carriers and/or invoice months (None = no filter).
+    """
+    mask = pd.Series(True, index=cube.index)
+    if carriers is not None:
+        mask &= cube['Carrier Name'].isin(carriers)
+    if months is not None:
+        mask &= cube['Invoice Month'].isin(months)
+    return cube if mask.all() else cube[mask]
+
+
+def rollup(cube, by, measures=None):
+    """
+    Sum cube measures up to the `by` dimension(s), one row per observed group.
+    """
+    measures = measures or [col for col in CUBE_MEASURES + CUBE_COUNTS if col in cube.columns]
+    return cube.groupby(by, observed=True)[measures].sum().reset_index()
+
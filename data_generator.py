@@ -0,0 +1,254 @@
+import zlib
+
+import numpy as np
+import pandas as pd
+
+
+RECONCILIATION_STATUSES = ['Pending', 'Completed', 'In Progress']
+DISPUTE_TYPES = ['Rate Dispute', 'Volume Dispute']
+SETTLEMENT_STATUSES = ['Settled', 'Unsettled']
+
+# Our own network, the settlement counterparty of every carrier
+OPERATOR = 'Home Network'
+
+INVOICE_COLUMNS = [
+    'Invoice Number', 'Carrier Name', 'Invoice Amount (USD)', 'Disputed Amount (USD)',
+    'Reconciliation Status', 'Dispute Type', 'Settlement Status', 'Invoice Month',
+    'Billing Cycle', 'Usage (Mins)', 'Disputed Usage (Mins)'
+]
+
+
+def _format_invoice_numbers(prefixes, numbers, width):
+    """
+    Vectorized equivalent of f'{prefix}{number:0{width}d}' for equal-length byte prefixes.
+    """
+    prefix_len = prefixes.dtype.itemsize
+    buf = np.empty((len(numbers), prefix_len + width), dtype=np.uint8)
+    buf[:, :prefix_len] = prefixes.view(np.uint8).reshape(-1, prefix_len)
+    powers = 10 ** np.arange(width - 1, -1, -1, dtype=np.int64)
+    buf[:, prefix_len:] = (numbers[:, None] // powers) % 10 + ord('0')
+    return buf.view(f'S{prefix_len + width}').ravel().astype(f'U{prefix_len + width}').astype(object)
+
+
+def iter_invoice_chunks(n_carriers=10, n_months=12, rows_per_carrier=1, dispute_rate=0.2,
+                        start_month="2024-01", seed=42, chunk_size=1_000_000):
+    """
+    Yield synthetic invoices as DataFrames of at most `chunk_size` rows.
+
+    Rows are laid out month by month, carrier by carrier, with `rows_per_carrier`
+    invoices per carrier per month, so the total is
+    n_months * n_carriers * rows_per_carrier. Output is reproducible for a given
+    seed and chunk size; only one chunk is held in memory at a time.
+    """
+    rng = np.random.default_rng(seed)
+    periods = pd.period_range(start=start_month, periods=n_months, freq='M')
+    month_labels = np.asarray(periods.strftime('%Y-%m'), dtype=object)
+    carriers = np.array([f'Carrier {i}' for i in range(1, n_carriers + 1)], dtype=object)
+
+    # Lookup tables indexed by month * 2 + (fortnight - 1) and month * n_carriers + carrier
+    cycle_labels = np.array([f'{m}-{f}' for m in month_labels for f in (1, 2)], dtype=object)
+    invoice_prefixes = np.array([
+        f'{c.replace(" ", "")[:3].upper()}-{m.replace("-", "")}-' for m in month_labels for c in carriers
+    ], dtype='S')
+
+    rows_per_month = n_carriers * rows_per_carrier
+    total_rows = n_months * rows_per_month
+    counter_width = max(4, len(str(total_rows)))
+
+    for start in range(0, total_rows, chunk_size):
+        stop = min(start + chunk_size, total_rows)
+        n = stop - start
+        row_ids = np.arange(start, stop, dtype=np.int64)
+        month_idx = row_ids // rows_per_month
+        carrier_idx = (row_ids // rows_per_carrier) % n_carriers
+
+        invoice_amount = np.round(rng.uniform(1000, 5000, n), 2)
+        is_disputed = rng.random(n) < dispute_rate
+        disputed_amount = np.where(is_disputed, np.round(rng.uniform(0, 1, n) * invoice_amount * 0.3, 2), 0.0)
+        fortnight = rng.integers(1, 3, n)
+
+        # Format: Year-Month-Fortnight, e.g. 2024-01-2
+        billing_cycle = cycle_labels[month_idx * 2 + fortnight - 1]
+
+        # Invoice numbers are sequential across the whole dataset, not per chunk
+        invoice_number = _format_invoice_numbers(
+            invoice_prefixes[month_idx * n_carriers + carrier_idx], row_ids + 1, counter_width
+        )
+
+        dispute_type = np.where(
+            is_disputed, np.array(DISPUTE_TYPES, dtype=object)[rng.integers(0, len(DISPUTE_TYPES), n)], None
+        )
+        settlement_status = np.where(
+            is_disputed, np.array(SETTLEMENT_STATUSES, dtype=object)[rng.integers(0, len(SETTLEMENT_STATUSES), n)],
+            'Settled'
+        )
+
+        # Disputed minutes depend on the dispute type: rate disputes can cover much
+        # larger volumes than volume disputes, undisputed invoices stay small
+        is_rate = dispute_type == 'Rate Dispute'
+        is_volume = dispute_type == 'Volume Dispute'
+        disputed_usage = np.select(
+            [is_rate, is_volume],
+            [rng.uniform(0, 5000, n), rng.uniform(100, 2000, n)],
+            rng.uniform(0, 500, n)
+        )
+
+        chunk = pd.DataFrame({
+            'Invoice Number': invoice_number,
+            'Carrier Name': carriers[carrier_idx],
+            'Invoice Amount (USD)': invoice_amount,
+            'Disputed Amount (USD)': disputed_amount,
+            'Reconciliation Status': np.array(RECONCILIATION_STATUSES, dtype=object)[
+                rng.integers(0, len(RECONCILIATION_STATUSES), n)],
+            'Dispute Type': dispute_type,
+            'Settlement Status': settlement_status,
+            'Invoice Month': month_labels[month_idx],
+            'Billing Cycle': billing_cycle,
+            'Usage (Mins)': np.round(rng.uniform(100, 500, n), 2),
+            'Disputed Usage (Mins)': np.round(disputed_usage, 2),
+        }, index=pd.RangeIndex(start, stop))
+        yield chunk
+
+
+def generate_invoice_data(n_carriers=10, n_months=12, rows_per_carrier=1, dispute_rate=0.2,
+                          start_month="2024-01", seed=42, chunk_size=1_000_000):
+    """
+    Build the full synthetic invoice frame from `iter_invoice_chunks`.
+    """
+    chunks = iter_invoice_chunks(n_carriers, n_months, rows_per_carrier, dispute_rate,
+                                 start_month, seed, chunk_size)
+    return pd.concat(chunks, copy=False)
+
+
+def generate_usage_records(invoices, records_per_cycle=20, missing_rate=0.05, seed=42):
+    """
+    Synthetic internal usage/rating records for `invoices`, one frame with
+    'Carrier Name', 'Billing Cycle', 'Usage (Mins)' and 'Rated Amount (USD)'.
+
+    Each (carrier, billing cycle) gets `records_per_cycle` records adding up to
+    the billed minutes and amount within +/-0.5%, except that rate-disputed
+    invoices are rated 5-30% cheaper and volume-disputed invoices have 5-30%
+    fewer minutes, and `missing_rate` of cycles have no usage yet. The
+    shortfall is scaled to the disputed invoices' share of their cycle's
+    amount (rate) or minutes (volume), so the cycle-level variance is that of
+    the disputed invoices and not of the whole cycle.
+    """
+    rng = np.random.default_rng(seed)
+    is_rate = (invoices['Dispute Type'] == 'Rate Dispute').to_numpy()
+    is_volume = (invoices['Dispute Type'] == 'Volume Dispute').to_numpy()
+    flags = invoices[['Carrier Name', 'Billing Cycle', 'Usage (Mins)', 'Invoice Amount (USD)']].assign(
+        rate_amount=np.where(is_rate, invoices['Invoice Amount (USD)'].to_numpy(dtype=np.float64), 0.0),
+        volume_mins=np.where(is_volume, invoices['Usage (Mins)'].to_numpy(dtype=np.float64), 0.0),
+    )
+    totals = flags.groupby(['Carrier Name', 'Billing Cycle'], observed=True, sort=False).sum()
+    totals = totals[rng.random(len(totals)) >= missing_rate]
+    n = len(totals)
+
+    billed_mins = totals['Usage (Mins)'].to_numpy(dtype=np.float64)
+    billed_amount = totals['Invoice Amount (USD)'].to_numpy(dtype=np.float64)
+    billed_rate = billed_amount / billed_mins
+    rate_share = totals['rate_amount'].to_numpy() / billed_amount
+    volume_share = totals['volume_mins'].to_numpy() / billed_mins
+    # A disputed invoice overbilled by a factor u is rated at 1/u of it, which
+    # takes share * (1 - 1/u) off its cycle
+    mins_factor = np.where(
+        volume_share > 0, 1 - volume_share * (1 - 1 / rng.uniform(1.05, 1.3, n)), rng.uniform(0.995, 1.005, n)
+    )
+    rate_factor = np.where(
+        rate_share > 0, 1 - rate_share * (1 - 1 / rng.uniform(1.05, 1.3, n)), rng.uniform(0.995, 1.005, n)
+    )
+
+    # Split each cycle's minutes across its records with random weights
+    key_idx = np.repeat(np.arange(n), records_per_cycle)
+    weights = rng.random(len(key_idx)) + 0.1
+    weights /= np.bincount(key_idx, weights=weights, minlength=n)[key_idx]
+    minutes = (billed_mins * mins_factor)[key_idx] * weights
+    return pd.DataFrame({
+        'Carrier Name': totals.index.get_level_values('Carrier Name').take(key_idx),
+        'Billing Cycle': totals.index.get_level_values('Billing Cycle').take(key_idx),
+        'Usage (Mins)': minutes,
+        'Rated Amount (USD)': minutes * (billed_rate * rate_factor)[key_idx],
+    })
+
+
+def _key_hashes(carriers, cycles):
+    """
+    One stable 64-bit key per (carrier, cycle) row from the CRC32 of both labels,
+    hashed once per distinct label.
+    """
+    hashes = []
+    for labels in (carriers, cycles):
+        codes, uniques = pd.factorize(labels)
+        hashes.append(np.array([zlib.crc32(str(label).encode()) for label in uniques], dtype=np.uint64)[codes])
+    return (hashes[0] << np.uint64(32)) ^ hashes[1]
+
+
+def _keyed_uniform(seed, keys, draw):
+    """
+    Uniform [0, 1) numbers that depend only on (seed, key, draw), for keys from _key_hashes.
+
+    Counter-based (a splitmix64 hash of the key) rather than one stream drawn
+    across all keys, so the numbers of a key do not move when other keys are
+    added or the rows come in another order.
+    """
+    x = keys ^ np.uint64((seed * 0x9E3779B97F4A7C15) % 2 ** 64)
+    x = x + np.broadcast_to(np.asarray(draw, dtype=np.uint64), keys.shape) * np.uint64(0xD1B54A32D192ED03)
+    x ^= x >> np.uint64(30)
+    x *= np.uint64(0xBF58476D1CE4E5B9)
+    x ^= x >> np.uint64(27)
+    x *= np.uint64(0x94D049BB133111EB)
+    x ^= x >> np.uint64(31)
+    return (x >> np.uint64(11)).astype(np.float64) * 2.0 ** -53
+
+
+def generate_interconnect_obligations(receivables, partners_per_carrier=5, seed=42):
+    """
+    Synthetic settlement obligations to go with `receivables`, a frame of
+    'Carrier Name', 'Billing Cycle' and 'Amount (USD)' (what each carrier owes
+    OPERATOR per cycle).
+
+    Returns 'Billing Cycle', 'Debtor', 'Creditor', 'Amount (USD)' rows:
+    per (carrier, cycle) what the operator owes the carrier for terminated
+    traffic (30-120% of the receivable), plus transit charges the carrier
+    owes `partners_per_carrier` other carriers of the same cycle (2-20% each).
+    Draws are keyed on (carrier, cycle) and partners come from the same
+    cycle, so adding billing cycles never changes the obligations of earlier ones.
+    """
+    carriers = np.asarray(receivables['Carrier Name'], dtype=object)
+    cycles = np.asarray(receivables['Billing Cycle'], dtype=object)
+    amount = receivables['Amount (USD)'].to_numpy(dtype=np.float64)
+    keys = _key_hashes(carriers, cycles)
+
+    payables = pd.DataFrame({
+        'Billing Cycle': cycles,
+        'Debtor': OPERATOR,
+        'Creditor': carriers,
+        'Amount (USD)': np.round(amount * (0.3 + 0.9 * _keyed_uniform(seed, keys, 0)), 2),
+    })
+    if partners_per_carrier == 0:
+        return payables
+
+    # Each cycle's carriers in name order; a carrier's partners are the ones a random offset after it
+    cycle_codes, _ = pd.factorize(cycles)
+    carrier_codes, _ = pd.factorize(carriers, sort=True)
+    order = np.lexsort((carrier_codes, cycle_codes))
+    size = np.bincount(cycle_codes)
+    start = np.concatenate([[0], np.cumsum(size)[:-1]])
+    rank = np.empty(len(carriers), dtype=np.int64)
+    rank[order] = np.arange(len(carriers)) - start[cycle_codes[order]]
+    members = carriers[order]
+
+    idx = np.repeat(np.arange(len(carriers)), partners_per_carrier)
+    slot = np.tile(np.arange(partners_per_carrier, dtype=np.uint64), len(carriers))
+    cycle_size = size[cycle_codes[idx]]
+    idx, slot, cycle_size = idx[cycle_size > 1], slot[cycle_size > 1], cycle_size[cycle_size > 1]
+    offset = 1 + (_keyed_uniform(seed, keys[idx], 1 + 2 * slot) * (cycle_size - 1)).astype(np.int64)
+    partners = members[start[cycle_codes[idx]] + (rank[idx] + offset) % cycle_size]
+    fraction = 0.02 + 0.18 * _keyed_uniform(seed, keys[idx], 2 + 2 * slot)
+    transit = pd.DataFrame({
+        'Billing Cycle': cycles[idx],
+        'Debtor': carriers[idx],
+        'Creditor': partners,
+        'Amount (USD)': np.round(amount[idx] * fraction, 2),
+    })
+    return pd.concat([payables, transit], ignore_index=True)
@@ -0,0 +1,306 @@
+import glob
+import os
+import threading
+import time
+
+import pandas as pd
+import streamlit as st
+
+from cdr_ingest import CdrIngest
+from cube import append_to_cube, build_reconciliation_cube, filter_cube
+from data_generator import generate_usage_records, iter_invoice_chunks
+from filter_index import FilterIndex
+from kpis import KpiAccumulator
+from netting import SettlementNetting, settlement_ledger
+from normalize import concat_normalized, normalize_invoice_frame
+from parquet_backend import ParquetInvoiceStore, write_partitioned
+from reconciliation import reconcile_invoices
+from snapshot import load_or_build
+
+
+# Copy-on-write means filtering or adding columns in one session never writes
+# through to the shared frame held by the resource cache.
+pd.set_option("mode.copy_on_write", True)
+
+# Shape of the synthetic dataset, overridable for load testing
+DATASET_CONFIG = {
+    'n_carriers': int(os.environ.get("BILLING_CARRIERS", 10)),
+    'n_months': int(os.environ.get("BILLING_MONTHS", 12)),
+    'rows_per_carrier': int(os.environ.get("BILLING_ROWS_PER_CARRIER", 1)),
+    'dispute_rate': float(os.environ.get("BILLING_DISPUTE_RATE", 0.2)),
+    'seed': int(os.environ.get("BILLING_SEED", 42)),
+}
+
+# Reconciliation process pool size (unset = one worker per CPU)
+RECONCILE_WORKERS = int(os.environ.get("BILLING_RECONCILE_WORKERS", 0)) or None
+
+# CDR files or glob patterns (os.pathsep-separated) to reconcile against, re-expanded on every
+# ingest so files for new cycles are picked up; unset = synthetic usage records
+CDR_PATHS = [path for path in os.environ.get("BILLING_CDR_PATHS", "").split(os.pathsep) if path]
+CDR_CHECKPOINT = os.environ.get("BILLING_CDR_CHECKPOINT") or None
+
+# "pandas" keeps everything in memory; "parquet" queries partitioned Parquet under BILLING_PARQUET_PATH
+BACKEND = os.environ.get("BILLING_BACKEND", "pandas")
+PARQUET_ROOT = os.environ.get("BILLING_PARQUET_PATH", "invoice_parquet")
+
+# Prepared invoices are memory-mapped from this Arrow file when it matches the
+# configuration, and written there after a build otherwise (unset = always build)
+SNAPSHOT_PATH = os.environ.get("BILLING_SNAPSHOT_PATH") or None
+
+# Optional time-based expiry on top of explicit invalidation (unset = never expire)
+DATA_TTL_SECONDS = int(os.environ.get("BILLING_DATA_TTL", 0)) or None
+
+
+# Process-wide data version and the derived state built for it. A module
+# global rather than st.cache_resource, which only caches inside a script run,
+# so appends made outside a session (ingestion jobs, the refresh worker) share
+# it. `lock` guards lookups and the swap; `append_lock` serializes writers.
+# `appended` keeps the pandas backend's appended rows as (version, rows), so a
+# frame rebuilt after expiry or invalidation replays them on the base data.
+_VERSION_STATE = {
+    'version': 0, 'lock': threading.Lock(), 'append_lock': threading.Lock(), 'derived': {}, 'built_at': None,
+    'appended': [],
+}
+
+
+# Incremental CDR ingest shared by the base build and appends, so each record is read once
+_CDR_STATE = {'ingest': None, 'lock': threading.Lock()}
+
+
+def _data_version_state():
+    return _VERSION_STATE
+
+
+def current_data_version():
+    return _data_version_state()['version']
+
+
+def _derived(data_version, name, build):
+    """
+    Derived object `name` for `data_version`, built on first use.
+
+    Only the current version's objects are kept (and dropped after
+    DATA_TTL_SECONDS), so append_billing_cycle can extend them instead of
+    rebuilding. This is the only cache of the shared data: the load_*
+    functions below read through it rather than adding st.cache_resource,
+    whose separate TTL and entries would hold stale copies of the same objects.
+    """
+    state = _data_version_state()
+    with state['lock']:
+        if DATA_TTL_SECONDS and state['built_at'] and time.monotonic() - state['built_at'] > DATA_TTL_SECONDS:
+            state['derived'] = {}
+        objects = state['derived'].get(data_version, {})
+        if name in objects:
+            return objects[name]
+    value = build()
+    with state['lock']:
+        if data_version == state['version']:
+            if not state['derived']:
+                state['built_at'] = time.monotonic()
+            state['derived'].setdefault(data_version, {})[name] = value
+    return value
+
+
+def invalidate_invoice_data():
+    """
+    Bump the data version, e.g. when a new billing cycle lands.
+
+    Every session picks up the reloaded frame on its next rerun; the old copy
+    is dropped immediately. Appended billing cycles are kept:
+    they are replayed on the reloaded frame (or read back from their Parquet
+    partition files).
+    """
+    state = _data_version_state()
+    with state['append_lock'], state['lock']:
+        state['version'] += 1
+        state['derived'] = {}
+    return state['version']
+
+
+def append_billing_cycle(invoices, usage=None):
+    """
+    Add one billing cycle of raw invoices and publish the result as a new data version.
+
+    The new rows are normalized and reconciled on their own, against `usage`
+    (e.g. from a per-cycle ingest), else the configured CDRs' usage for the
+    new rows' billing cycles or synthetic usage records, then folded into the current version's
+    derived state: cube cells are re-aggregated only for the affected
+    cycles, the filter index buckets only the new rows (which also extends
+    the carrier/month options), and KPI counters are added. Nothing is
+    recomputed from history.
+
+    Safe to call from any thread. The next version is built without holding
+    up readers, who keep using the current one; the switch is a single swap
+    under the lock, picked up by sessions on their next rerun.
+    """
+    state = _data_version_state()
+    with state['append_lock']:
+        version = state['version']
+        rows = normalize_invoice_frame(invoices)
+        if usage is None and CDR_PATHS:
+            usage = cdr_usage(rows['Billing Cycle'].astype(str).unique())
+        elif usage is None:
+            usage = generate_usage_records(rows, seed=DATASET_CONFIG['seed'] + version + 1)
+        rows, _ = reconcile_invoices(rows, usage, max_workers=RECONCILE_WORKERS)
+        kpis = load_kpi_accumulator(version).copy().update(rows)
+
+        if BACKEND == "parquet":
+            # New partition files; the store for the next version discovers them
+            write_partitioned(rows, PARQUET_ROOT, append_tag=f"append-{version + 1}")
+            derived = {'kpis': kpis}
+        else:
+            previous = _invoice_data(version)
+            rows.index = pd.RangeIndex(len(previous), len(previous) + len(rows))
+            combined = concat_normalized([previous, rows])
+            derived = {
+                'invoices': combined,
+                'cube': append_to_cube(_reconciliation_cube(version), rows),
+                'filter_index': load_filter_index(version).extended(combined),
+                'kpis': kpis,
+            }
+
+        with state['lock']:
+            if BACKEND != "parquet":
+                state['appended'].append((version + 1, rows))
+            state['derived'] = {version + 1: derived}
+            state['built_at'] = time.monotonic()
+            state['version'] = version + 1
+        return version + 1
+
+
+def build_invoice_data():
+    """
+    Build the reconciled, normalized invoice frame.
+
+    Chunks are normalized to the compact typed representation as they are
+    generated, so the raw object-string form never exists in full. Statuses,
+    dispute types and disputed amounts come from reconciling the invoices
+    against usage aggregated from the CDR files (or synthetic usage records
+    when none are configured). Callers must treat the result as read-only.
+    """
+    invoices = concat_normalized(normalize_invoice_frame(chunk) for chunk in iter_invoice_chunks(**DATASET_CONFIG))
+    if CDR_PATHS:
+        usage = cdr_usage()
+    else:
+        usage = generate_usage_records(invoices, seed=DATASET_CONFIG['seed'])
+    reconciled, _ = reconcile_invoices(invoices, usage, max_workers=RECONCILE_WORKERS)
+    return reconciled
+
+
+def cdr_paths():
+    """
+    The CDR files currently matching CDR_PATHS.
+    """
+    return sorted({path for pattern in CDR_PATHS for path in glob.glob(pattern)})
+
+
+def cdr_usage(cycles=None):
+    """
+    Usage aggregated from the CDR files, optionally only for the billing cycles labelled `cycles`.
+
+    Only files new since the last call and records appended to known files
+    are read (see CdrIngest); with BILLING_CDR_CHECKPOINT that progress
+    survives restarts.
+    """
+    with _CDR_STATE['lock']:
+        if _CDR_STATE['ingest'] is None:
+            _CDR_STATE['ingest'] = CdrIngest(CDR_CHECKPOINT)
+        return _CDR_STATE['ingest'].update(cdr_paths()).usage(cycles)
+
+
+def snapshot_fingerprint():
+    """
+    What a snapshot of build_invoice_data() depends on: the dataset configuration and CDR inputs.
+    """
+    cdr_sources = [[os.path.abspath(path), os.stat(path).st_size, os.stat(path).st_mtime] for path in cdr_paths()]
+    return {'dataset': DATASET_CONFIG, 'cdrs': cdr_sources}
+
+
+def load_base_invoice_data():
+    """
+    build_invoice_data(), memory-mapped from the snapshot at SNAPSHOT_PATH when one is configured.
+    """
+    if SNAPSHOT_PATH is None:
+        return build_invoice_data()
+    return load_or_build(SNAPSHOT_PATH, snapshot_fingerprint(), build_invoice_data)
+
+
+def _build_invoice_data(data_version):
+    """
+    The base frame plus every billing cycle appended up to `data_version`.
+    """
+    with _data_version_state()['lock']:
+        appended = [rows for version, rows in _data_version_state()['appended'] if version <= data_version]
+    base = load_base_invoice_data()
+    return concat_normalized([base, *appended]) if appended else base
+
+
+def _invoice_data(data_version):
+    return _derived(data_version, 'invoices', lambda: _build_invoice_data(data_version))
+
+
+def _reconciliation_cube(data_version):
+    return _derived(data_version, 'cube', lambda: build_reconciliation_cube(_invoice_data(data_version)))
+
+
+def _parquet_store(data_version):
+    if not os.path.isdir(PARQUET_ROOT):
+        write_partitioned(load_base_invoice_data(), PARQUET_ROOT)
+    return _derived(data_version, 'parquet_store', lambda: ParquetInvoiceStore(PARQUET_ROOT))
+
+
+def load_filter_index(data_version):
+    """
+    Build the per-value row position index once per data version.
+
+    With the Parquet backend this is the store itself, which answers the
+    same filter calls with partition-pruned queries.
+    """
+    if BACKEND == "parquet":
+        return _parquet_store(data_version)
+    return _derived(data_version, 'filter_index', lambda: FilterIndex(_invoice_data(data_version)))
+
+
+def get_filter_index():
+    """
+    Return the shared filter index for the current data version.
+
+    The first call of a version builds the invoice data and the index, hence the spinner.
+    """
+    with st.spinner("Loading invoice data..."):
+        return load_filter_index(current_data_version())
+
+
+def query_cube(data_version, carriers=None, months=None):
+    """
+    Reconciliation cube restricted to the selected carriers and months (None = no filter).
+
+    The pandas backend filters the in-memory cube; the Parquet backend
+    pushes the filter and the group-by down to the dataset.
+    """
+    if BACKEND == "parquet":
+        return _parquet_store(data_version).cube(carriers, months)
+    return filter_cube(_reconciliation_cube(data_version), carriers, months)
+
+
+def _full_cube(data_version):
+    return _parquet_store(data_version).cube() if BACKEND == "parquet" else _reconciliation_cube(data_version)
+
+
+def load_kpi_accumulator(data_version):
+    """
+    Per-billing-cycle KPI counters for the whole dataset, once per data version.
+    """
+    return _derived(data_version, 'kpis', lambda: KpiAccumulator().update(_full_cube(data_version)))
+
+
+def load_settlement_netting(data_version):
+    """
+    Bilateral and multilateral settlement netting across all carriers, once per data version.
+
+    Net positions depend on every participant, so they are computed for the
+    whole network and the tabs select the carriers and cycles they show.
+    """
+    return _derived(data_version, 'netting', lambda: SettlementNetting(
+        settlement_ledger(_full_cube(data_version), seed=DATASET_CONFIG['seed'])
+    ))
@@ -0,0 +1,246 @@
+import glob
+import os
+import tempfile
+import threading
+import time
+
+import pandas as pd
+import streamlit as st
+
+
+# Label -> (file extension, MIME type)
+EXPORT_FORMATS = {
+    'CSV': ('csv', 'text/csv'),
+    'Parquet': ('parquet', 'application/vnd.apache.parquet'),
+    'Excel': ('xlsx', 'application/vnd.openxmlformats-officedocument.spreadsheetml.sheet'),
+}
+
+# Rows converted and written per step; bounds the memory an export needs on top of the data
+EXPORT_CHUNK_ROWS = 100_000
+
+# Exports up to this size are written within the rerun; larger ones in a background job
+EXPORT_INLINE_ROWS = 100_000
+
+EXPORT_POLL_SECONDS = 1.0
+
+# Export files are deleted once downloaded; ones never downloaded (abandoned
+# sessions) are swept when they have not been written for this long
+EXPORT_MAX_AGE_SECONDS = int(os.environ.get("BILLING_EXPORT_MAX_AGE", 3600))
+
+# The download button reads the whole file into server memory; warn above this size
+EXPORT_DOWNLOAD_WARN_BYTES = 200 * 1024 ** 2
+
+EXPORT_FILE_PREFIX = "billing-export-"
+
+# Data rows per worksheet (Excel's limit is 1,048,576 rows including the header)
+XLSX_SHEET_ROWS = 1_048_575
+
+
+def _plain(chunk):
+    """
+    Period columns as their 'YYYY-MM' labels; everything else keeps its dtype
+    (categoricals are written as their labels by every writer).
+    """
+    periods = [col for col in chunk.columns if isinstance(chunk[col].dtype, pd.PeriodDtype)]
+    return chunk.assign(**{col: chunk[col].astype(str) for col in periods}) if periods else chunk
+
+
+def _write_csv(chunks, path):
+    with open(path, 'w', newline='') as f:
+        for number, chunk in enumerate(chunks):
+            _plain(chunk).to_csv(f, header=number == 0, index=False)
+
+
+def _write_parquet(chunks, path):
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+
+    writer = None
+    try:
+        for chunk in chunks:
+            table = pa.Table.from_pandas(_plain(chunk), preserve_index=False)
+            # Categoricals as plain values, typed from their categories even in an all-missing chunk
+            table = table.cast(pa.schema([
+                pa.field(field.name, field.type.value_type if pa.types.is_dictionary(field.type) else field.type)
+                for field in table.schema
+            ]))
+            if writer is None:
+                writer = pq.ParquetWriter(path, table.schema)
+            writer.write_table(table.cast(writer.schema))
+    finally:
+        if writer is not None:
+            writer.close()
+
+
+def _write_xlsx(chunks, path):
+    from openpyxl import Workbook
+
+    # Write-only mode streams rows to disk instead of building the sheet in memory
+    workbook = Workbook(write_only=True)
+    sheet, sheet_rows = None, XLSX_SHEET_ROWS
+    for chunk in chunks:
+        chunk = _plain(chunk)
+        values = chunk.astype(object).where(chunk.notna(), None)
+        for row in values.itertuples(index=False, name=None):
+            if sheet_rows == XLSX_SHEET_ROWS:
+                sheet, sheet_rows = workbook.create_sheet(), 0
+                sheet.append(list(chunk.columns))
+            sheet.append(row)
+            sheet_rows += 1
+    if sheet is None:
+        workbook.create_sheet()
+    workbook.save(path)
+
+
+WRITERS = {'CSV': _write_csv, 'Parquet': _write_parquet, 'Excel': _write_xlsx}
+
+
+def write_export(chunks, path, fmt):
+    """
+    Stream DataFrame `chunks` into a `fmt` file (a key of EXPORT_FORMATS), one chunk in memory at a time.
+    """
+    WRITERS[fmt](chunks, path)
+
+
+def sweep_exports(max_age=None):
+    """
+    Delete export files not written for `max_age` seconds (default EXPORT_MAX_AGE_SECONDS).
+    """
+    cutoff = time.time() - (EXPORT_MAX_AGE_SECONDS if max_age is None else max_age)
+    for path in glob.glob(os.path.join(tempfile.gettempdir(), f"{EXPORT_FILE_PREFIX}*")):
+        try:
+            if os.path.getmtime(path) < cutoff:
+                os.remove(path)
+        except OSError:
+            pass  # already removed, e.g. by another session's sweep
+
+
+def frame_chunks(frame):
+    """
+    Chunk source for an in-memory frame, e.g. a summary table.
+    """
+    return lambda chunk_rows: (frame.iloc[start:start + chunk_rows] for start in range(0, len(frame), chunk_rows))
+
+
+class ExportJob(threading.Thread):
+    """
+    Writes one export to a temporary file and tracks its progress.
+
+    `chunks(chunk_rows)` yields the rows to export. Call run() to export
+    in the current thread or start() to export in the background.
+    """
+
+    def __init__(self, fmt, total_rows, chunks, state):
+        super().__init__(name="billing-export", daemon=True)
+        self.fmt = fmt
+        self.total_rows = total_rows
+        self.chunks = chunks
+        self.state = state
+        self.rows_done = 0
+        self.error = None
+        self.finished = False
+        self._cancelled = False
+        fd, self.path = tempfile.mkstemp(prefix=EXPORT_FILE_PREFIX, suffix=f".{EXPORT_FORMATS[fmt][0]}")
+        os.close(fd)
+
+    @property
+    def progress(self):
+        return min(1.0, self.rows_done / self.total_rows) if self.total_rows else 1.0
+
+    def _counted(self):
+        for chunk in self.chunks(EXPORT_CHUNK_ROWS):
+            if self._cancelled:
+                return
+            yield chunk
+            self.rows_done += len(chunk)
+
+    def run(self):
+        try:
+            write_export(self._counted(), self.path, self.fmt)
+        except Exception as exc:
+            self.error = f"{type(exc).__name__}: {exc}"
+        self.finished = True
+        if self._cancelled:
+            self._remove()
+
+    def discard(self):
+        """
+        Stop the export if it is still running and delete its file.
+        """
+        self._cancelled = True
+        if self.finished or not self.is_alive():
+            self._remove()
+
+    def _remove(self):
+        if os.path.exists(self.path):
+            os.remove(self.path)
+
+
+def _downloaded(job_key):
+    """
+    Download button callback: the file has been read into the download, so delete it.
+    """
+    job = st.session_state.pop(job_key, None)
+    if job is not None:
+        job.discard()
+
+
+@st.fragment(run_every=EXPORT_POLL_SECONDS)
+def _export_progress(job):
+    """
+    Poll a background export; the full rerun once it is done shows the download button.
+    """
+    if job.finished:
+        st.rerun()
+    st.progress(job.progress, text=f"Exporting {job.rows_done:,} of {job.total_rows:,} rows...")
+
+
+def export_controls(key, file_name, total_rows, chunks, state):
+    """
+    Format picker, "Prepare export" button and download button for one table.
+
+    `chunks(chunk_rows)` yields the rows to export as DataFrames in their
+    native dtypes, not display copies. `state` identifies what they hold
+    (data version and filters), so a prepared file is only offered while it
+    still matches what the table shows. The file is deleted once downloaded
+    or when the table changes; abandoned files are swept by age.
+    """
+    job_key = f"{key}_export"
+    controls = st.columns([1, 1, 3])
+    with controls[0]:
+        fmt = st.selectbox("Export format", list(EXPORT_FORMATS), key=f"{key}_export_format",
+                           label_visibility="collapsed")
+
+    job = st.session_state.get(job_key)
+    if job is not None and job.state != (state, fmt):
+        job.discard()
+        job = st.session_state[job_key] = None
+
+    with controls[1]:
+        if job is None and st.button("Prepare export", key=f"{key}_export_start", disabled=not total_rows):
+            sweep_exports()
+            job = st.session_state[job_key] = ExportJob(fmt, total_rows, chunks, (state, fmt))
+            if total_rows <= EXPORT_INLINE_ROWS:
+                job.run()
+            else:
+                job.start()
+
+    if job is not None and job.finished and not job.error and not os.path.exists(job.path):
+        job = st.session_state[job_key] = None  # swept after EXPORT_MAX_AGE_SECONDS
+
+    if job is None:
+        return
+    with controls[2]:
+        if not job.finished:
+            _export_progress(job)
+        elif job.error:
+            st.error(f"Export failed: {job.error}")
+        else:
+            extension, mime = EXPORT_FORMATS[fmt]
+            size = os.path.getsize(job.path)
+            if size > EXPORT_DOWNLOAD_WARN_BYTES:
+                st.warning(f"This {size / 1024 ** 2:,.0f} MB file is held in server memory while it is offered "
+                           "for download; narrow the filters for a smaller export.")
+            with open(job.path, 'rb') as f:
+                st.download_button(f"Download {fmt} ({total_rows:,} rows)", data=f, file_name=f"{file_name}.{extension}",
+                                   mime=mime, key=f"{key}_export_download", on_click=_downloaded, args=(job_key,))
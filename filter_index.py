@@ -0,0 +1,206 @@
+import numpy as np
+import pandas as pd
+
+
+INDEXED_COLUMNS = [
+    'Carrier Name', 'Invoice Month', 'Billing Cycle',
+    'Reconciliation Status', 'Dispute Type', 'Settlement Status'
+]
+
+
+def _codes_and_values(column):
+    """
+    Integer codes (-1 for missing) and the distinct values they point to.
+    """
+    if isinstance(column.dtype, pd.CategoricalDtype):
+        return column.cat.codes.to_numpy(), column.cat.categories
+    codes, values = pd.factorize(column, sort=True)
+    return codes, values
+
+
+class FilterView:
+    """
+    Lazily materialized subset of the invoice frame.
+
+    `positions` is None when no filter is active, in which case the shared
+    frame is returned as-is rather than copied.
+    """
+
+    def __init__(self, df, positions=None):
+        self.df = df
+        self.positions = positions
+
+    def __len__(self):
+        return len(self.df) if self.positions is None else len(self.positions)
+
+    @property
+    def empty(self):
+        return len(self) == 0
+
+    @property
+    def columns(self):
+        return self.df.columns
+
+    def frame(self, columns=None):
+        data = self.df if columns is None else self.df[columns]
+        if self.positions is None:
+            return data
+        return data.take(self.positions)
+
+    def take(self, positions, columns=None):
+        """
+        Rows at `positions` (in that order) among the selected rows, e.g. one table page.
+        """
+        data = self.df if columns is None else self.df[columns]
+        return data.take(positions if self.positions is None else self.positions[positions])
+
+    def iter_chunks(self, chunk_rows, columns=None):
+        """
+        Yield the selected rows as frames of at most `chunk_rows` rows, copying one chunk at a time.
+        """
+        data = self.df if columns is None else self.df[columns]
+        for start in range(0, len(self), chunk_rows):
+            if self.positions is None:
+                yield data.iloc[start:start + chunk_rows]
+            else:
+                yield data.take(self.positions[start:start + chunk_rows])
+
+
+class FilterIndex:
+    """
+    Per-value row position lists ("bitmaps") for the filterable invoice columns.
+
+    Rows are bucketed once per data version; a filter then reads only the
+    posting lists of the selected values, so its cost follows the size of the
+    result rather than the size of the table.
+    """
+
+    def __init__(self, df, columns=INDEXED_COLUMNS):
+        self.df = df
+        position_dtype = np.int32 if len(df) < 2 ** 31 else np.int64
+        self.values = {}
+        self._codes = {}
+        self._offsets = {}
+        self._positions = {}
+        for col in columns:
+            codes, values = _codes_and_values(df[col])
+            # Shift codes by one so missing values (-1) get their own bucket 0
+            shifted = codes.astype(np.int16 if len(values) < 2 ** 15 - 1 else np.int64) + 1
+            counts = np.bincount(shifted, minlength=len(values) + 1)
+            self.values[col] = values
+            self._codes[col] = codes
+            self._offsets[col] = np.concatenate([[0], np.cumsum(counts)])
+            # Stable sort keeps positions ascending within each bucket (radix sort for int16)
+            self._positions[col] = np.argsort(shifted, kind='stable').astype(position_dtype)
+
+    def extended(self, df):
+        """
+        Index for `df`, whose first len(self.df) rows are the rows already indexed.
+
+        Only the appended rows are bucketed; the existing posting lists are
+        copied across (re-keyed if new values changed the category order), so
+        the cost follows the size of the new rows rather than the history.
+        Returns a new index and leaves this one untouched for readers of the
+        previous data version.
+        """
+        old_n = len(self.df)
+        index = object.__new__(FilterIndex)
+        index.df = df
+        position_dtype = np.int32 if len(df) < 2 ** 31 else np.int64
+        index.values, index._codes, index._offsets, index._positions = {}, {}, {}, {}
+        for col, old_values in self.values.items():
+            column = df[col]
+            if isinstance(column.dtype, pd.CategoricalDtype):
+                codes, values = column.cat.codes.to_numpy(), column.cat.categories
+                new_codes = codes[old_n:]
+            else:
+                added_codes, added_values = _codes_and_values(column.iloc[old_n:])
+                values = old_values.append(added_values).unique().sort_values()
+                remap = np.append(values.get_indexer(old_values), -1)
+                new_codes = np.where(added_codes >= 0, values.get_indexer(added_values)[added_codes], -1)
+                codes = np.concatenate([remap[self._codes[col]], new_codes])
+
+            # Bucket ids (code + 1, 0 = missing) of the old buckets under the new values
+            bucket_map = np.concatenate([[0], values.get_indexer(old_values) + 1])
+            old_counts = np.diff(self._offsets[col])
+            new_shifted = new_codes.astype(np.int64) + 1
+            new_counts = np.bincount(new_shifted, minlength=len(values) + 1)
+            counts = np.bincount(bucket_map, weights=old_counts, minlength=len(values) + 1).astype(np.int64)
+            offsets = np.concatenate([[0], np.cumsum(counts + new_counts)])
+
+            # Within each bucket, old positions come first and new ones (all larger) after
+            positions = np.empty(len(df), dtype=position_dtype)
+            old_positions = self._positions[col]
+            for old_bucket, bucket in enumerate(bucket_map):
+                start, stop = self._offsets[col][old_bucket], self._offsets[col][old_bucket + 1]
+                positions[offsets[bucket]:offsets[bucket] + stop - start] = old_positions[start:stop]
+            new_order = np.argsort(new_shifted, kind='stable')
+            new_offsets = np.concatenate([[0], np.cumsum(new_counts)])
+            for bucket in np.flatnonzero(new_counts):
+                start = offsets[bucket] + counts[bucket]
+                positions[start:start + new_counts[bucket]] = \
+                    new_order[new_offsets[bucket]:new_offsets[bucket + 1]] + old_n
+
+            index.values[col] = values
+            index._codes[col] = codes
+            index._offsets[col] = offsets
+            index._positions[col] = positions
+        return index
+
+    def _buckets(self, col, selected):
+        """
+        Bucket ids (code + 1) of the selected values; a missing value selects bucket 0.
+        """
+        selected = pd.Index(list(selected))
+        known = selected[selected.notna()]
+        codes = self.values[col].get_indexer(known.astype(self.values[col].dtype, copy=False)) if len(known) else []
+        buckets = [code + 1 for code in codes if code >= 0]
+        if selected.hasnans:
+            buckets.append(0)
+        return np.array(buckets, dtype=np.int64)
+
+    def positions(self, col, selected):
+        """
+        Sorted row positions whose `col` value is in `selected`.
+        """
+        offsets, positions = self._offsets[col], self._positions[col]
+        slices = [positions[offsets[b]:offsets[b + 1]] for b in self._buckets(col, selected)]
+        if not slices:
+            return positions[:0]
+        if len(slices) == 1:
+            return slices[0]
+        return np.sort(np.concatenate(slices))
+
+    def values_between(self, col, low, high):
+        """
+        Indexed values of an ordered column that fall within [low, high].
+        """
+        values = self.values[col]
+        return list(values[(values >= low) & (values <= high)])
+
+    def select(self, filters):
+        """
+        Intersect per-column selections into a FilterView.
+
+        `filters` maps column name to a collection of accepted values; None
+        leaves that column unfiltered.
+        """
+        active = {col: selected for col, selected in filters.items() if selected is not None}
+        if not active:
+            return FilterView(self.df)
+
+        # Start from the smallest candidate set and check the remaining
+        # columns through their code arrays instead of scanning whole columns
+        sizes = {col: self._selection_size(col, selected) for col, selected in active.items()}
+        driver = min(sizes, key=sizes.get)
+        result = self.positions(driver, active.pop(driver))
+        for col, selected in active.items():
+            accepted = np.zeros(len(self.values[col]) + 1, dtype=bool)
+            accepted[self._buckets(col, selected)] = True
+            result = result[accepted[self._codes[col][result] + 1]]
+        return FilterView(self.df, result)
+
+    def _selection_size(self, col, selected):
+        offsets = self._offsets[col]
+        buckets = self._buckets(col, selected)
+        return int((offsets[buckets + 1] - offsets[buckets]).sum())
@@ -0,0 +1,206 @@
+import contextlib
+import contextvars
+import json
+import os
+import sys
+import threading
+import time
+import tracemalloc
+from dataclasses import asdict, dataclass
+
+import pandas as pd
+import streamlit as st
+
+
+# Opt-in: BILLING_PROFILE=1 for every session, or ?profile=1 for one session
+PROFILE_ENV = "BILLING_PROFILE"
+PROFILE_QUERY_PARAM = "profile"
+
+# JSON lines are appended here when set, otherwise written to stderr
+PROFILE_LOG = os.environ.get("BILLING_PROFILE_LOG")
+
+_TRUTHY = {"1", "true", "yes", "on"}
+_log_lock = threading.Lock()
+_active = contextvars.ContextVar("billing_profiler", default=None)
+
+# Profiled runs in progress, guarded by _log_lock. tracemalloc slows down every
+# allocation in the process, so it only runs while this is above zero (unless
+# something else started it).
+_tracing = {'runs': 0, 'owned': False}
+
+
+@dataclass
+class SectionTiming:
+    name: str
+    ms: float
+    peak_mb: float
+    allocated_mb: float
+
+
+class _Frame:
+    def __init__(self, name):
+        self.name = name
+        self.start = time.perf_counter()
+        self.start_memory, self.peak_memory = tracemalloc.get_traced_memory()
+
+
+class Profiler:
+    """
+    Wall time and tracemalloc memory per named section of one script run.
+
+    Sections nest; a nested section is reported as "outer/inner". Peak memory
+    is the high-water mark above the section's starting allocation.
+    tracemalloc is process-wide, so memory figures include any other session
+    running at the same time.
+    """
+
+    def __init__(self):
+        with _log_lock:
+            if _tracing['runs'] == 0 and not tracemalloc.is_tracing():
+                tracemalloc.start()
+                _tracing['owned'] = True
+            _tracing['runs'] += 1
+        self._closed = False
+        self.started = time.perf_counter()
+        self.sections = []
+        self._stack = []
+        self.context = {}
+
+    def close(self):
+        """
+        End this profiled run; the last one to end stops tracemalloc if it was started here.
+        """
+        with _log_lock:
+            if self._closed:
+                return
+            self._closed = True
+            _tracing['runs'] -= 1
+            if _tracing['runs'] == 0 and _tracing['owned']:
+                tracemalloc.stop()
+                _tracing['owned'] = False
+
+    def _note_peak(self):
+        _, peak = tracemalloc.get_traced_memory()
+        if self._stack:
+            self._stack[-1].peak_memory = max(self._stack[-1].peak_memory, peak)
+        return peak
+
+    @contextlib.contextmanager
+    def section(self, name):
+        self._note_peak()
+        tracemalloc.reset_peak()
+        path = "/".join([frame.name for frame in self._stack] + [name])
+        slot = len(self.sections)
+        self.sections.append(None)  # keep sections in start order
+        frame = _Frame(name)
+        self._stack.append(frame)
+        try:
+            yield
+        finally:
+            elapsed = time.perf_counter() - frame.start
+            current, peak = tracemalloc.get_traced_memory()
+            self._stack.pop()
+            peak = max(frame.peak_memory, peak)
+            if self._stack:
+                self._stack[-1].peak_memory = max(self._stack[-1].peak_memory, peak)
+            self.sections[slot] = SectionTiming(
+                name=path,
+                ms=round(elapsed * 1000, 3),
+                peak_mb=round((peak - frame.start_memory) / 1024 ** 2, 3),
+                allocated_mb=round((current - frame.start_memory) / 1024 ** 2, 3),
+            )
+
+    def record(self):
+        return {
+            'timestamp': time.time(),
+            'session': _session_id(),
+            'total_ms': round((time.perf_counter() - self.started) * 1000, 3),
+            **self.context,
+            'sections': [asdict(section) for section in self.sections if section is not None],
+        }
+
+
+def _session_id():
+    from streamlit.runtime.scriptrunner import get_script_run_ctx
+    ctx = get_script_run_ctx()
+    return ctx.session_id if ctx else None
+
+
+def profiling_enabled():
+    if os.environ.get(PROFILE_ENV, "").lower() in _TRUTHY:
+        return True
+    return st.query_params.get(PROFILE_QUERY_PARAM, "").lower() in _TRUTHY
+
+
+def start_profiling():
+    """
+    Begin profiling this script run if enabled; returns the Profiler or None.
+    """
+    profiler = Profiler() if profiling_enabled() else None
+    _active.set(profiler)
+    return profiler
+
+
+def profile_section(name):
+    """
+    Context manager timing `name` under the current run's profiler (a no-op when profiling is off).
+    """
+    profiler = _active.get()
+    return profiler.section(name) if profiler else contextlib.nullcontext()
+
+
+def set_profile_context(**context):
+    """
+    Attach extra fields (active view, filter sizes, ...) to this run's JSON line.
+    """
+    profiler = _active.get()
+    if profiler:
+        profiler.context.update(context)
+
+
+def _emit(record):
+    line = json.dumps(record, default=str)
+    with _log_lock:
+        if PROFILE_LOG:
+            with open(PROFILE_LOG, "a") as f:
+                f.write(line + "\n")
+        else:
+            print(line, file=sys.stderr, flush=True)
+
+
+def finish_profiling():
+    """
+    Emit this run's JSON line and render the timings panel.
+    """
+    profiler = _active.get()
+    if profiler is None:
+        return
+    _active.set(None)
+    record = profiler.record()
+    profiler.close()
+    _emit(record)
+
+    with st.expander(f"⏱️ Profiling: {record['total_ms']:,.1f} ms this run", expanded=False):
+        timings = pd.DataFrame(record['sections'], columns=['name', 'ms', 'peak_mb', 'allocated_mb'])
+        timings.columns = ['Section', 'Time (ms)', 'Peak Memory (MB)', 'Net Allocated (MB)']
+        st.dataframe(timings, use_container_width=True, hide_index=True)
+
+
+@contextlib.contextmanager
+def profiled_run():
+    """
+    Profile the enclosed script body if enabled and render its timings at the end.
+
+    Each rerun runs on a new thread, so a run that raises or is rerun
+    before finish_profiling would otherwise never release its profiler
+    (and tracemalloc with it); the profiler is closed on any exit.
+    """
+    start_profiling()
+    try:
+        yield
+        finish_profiling()
+    finally:
+        profiler = _active.get()
+        if profiler is not None:
+            _active.set(None)
+            profiler.close()
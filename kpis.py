@@ -0,0 +1,133 @@
+from dataclasses import dataclass
+
+import numpy as np
+import pandas as pd
+
+from normalize import parse_billing_cycles
+
+
+# Additive counters kept per billing cycle; every KPI card is derived from these
+KPI_COUNTERS = [
+    'Invoices', 'Settled', 'Unsettled', 'Pending', 'Pending Receivables',
+    'Rate Disputes', 'Volume Disputes', 'Ongoing Rate Disputes', 'Ongoing Volume Disputes',
+    'Disputed Amount',
+]
+
+
+@dataclass(frozen=True)
+class KpiSnapshot:
+    """
+    Counter-card values for one filtered view.
+
+    Receivables are invoice amounts net of the disputed amount. "Current"
+    is the latest billing cycle in the view and QTD covers the cycles of its
+    quarter up to and including it.
+    """
+    total_invoices: int = 0
+    settled_invoices: int = 0
+    unsettled_invoices: int = 0
+    current_cycle: str = None
+    current_cycle_pending_invoices: int = 0
+    current_cycle_pending_receivables: float = 0.0
+    qtd_pending_invoices: int = 0
+    qtd_pending_receivables: float = 0.0
+    rate_disputes: int = 0
+    volume_disputes: int = 0
+    ongoing_rate_disputes: int = 0
+    ongoing_volume_disputes: int = 0
+    total_disputed_amount: float = 0.0
+
+
+def _weighted_sum(codes, size, weights):
+    return np.bincount(codes, weights=weights, minlength=size)
+
+
+class KpiAccumulator:
+    """
+    Per-billing-cycle KPI counters that can be built from raw invoices or
+    cube cells and updated in place as new invoices are appended.
+    """
+
+    def __init__(self):
+        self.totals = pd.DataFrame(columns=KPI_COUNTERS, dtype='float64')
+
+    def copy(self):
+        """
+        Independent accumulator with the same totals, to update without affecting this one.
+        """
+        other = KpiAccumulator()
+        other.totals = self.totals.copy()
+        return other
+
+    def update(self, rows):
+        """
+        Add `rows` (raw invoices, or cube cells carrying an 'Invoice Count') in one pass.
+        """
+        if rows.empty:
+            return self
+        billing_cycle = rows['Billing Cycle']
+        if isinstance(billing_cycle.dtype, pd.CategoricalDtype):
+            cycle_codes, cycles = billing_cycle.cat.codes.to_numpy(), billing_cycle.cat.categories.astype(object)
+        else:
+            cycle_codes, cycles = pd.factorize(billing_cycle)
+        counts = rows['Invoice Count'].to_numpy(dtype=np.float64) if 'Invoice Count' in rows else np.ones(len(rows))
+        invoiced = rows['Invoice Amount (USD)'].to_numpy(dtype=np.float64)
+        disputed = rows['Disputed Amount (USD)'].to_numpy(dtype=np.float64)
+        settled = (rows['Settlement Status'] == 'Settled').to_numpy()
+        unsettled = (rows['Settlement Status'] == 'Unsettled').to_numpy()
+        pending = (rows['Reconciliation Status'] == 'Pending').to_numpy()
+        rate = (rows['Dispute Type'] == 'Rate Dispute').to_numpy()
+        volume = (rows['Dispute Type'] == 'Volume Dispute').to_numpy()
+
+        n = len(cycles)
+        partial = pd.DataFrame({
+            'Invoices': _weighted_sum(cycle_codes, n, counts),
+            'Settled': _weighted_sum(cycle_codes, n, counts * settled),
+            'Unsettled': _weighted_sum(cycle_codes, n, counts * unsettled),
+            'Pending': _weighted_sum(cycle_codes, n, counts * pending),
+            'Pending Receivables': _weighted_sum(cycle_codes, n, (invoiced - disputed) * pending),
+            'Rate Disputes': _weighted_sum(cycle_codes, n, counts * rate),
+            'Volume Disputes': _weighted_sum(cycle_codes, n, counts * volume),
+            'Ongoing Rate Disputes': _weighted_sum(cycle_codes, n, counts * (rate & unsettled)),
+            'Ongoing Volume Disputes': _weighted_sum(cycle_codes, n, counts * (volume & unsettled)),
+            'Disputed Amount': _weighted_sum(cycle_codes, n, disputed),
+        }, index=pd.Index(cycles, name='Billing Cycle'))
+        self.totals = partial if self.totals.empty else self.totals.add(partial, fill_value=0)
+        return self
+
+    def snapshot(self):
+        totals = self.totals[self.totals['Invoices'] > 0]
+        if totals.empty:
+            return KpiSnapshot()
+        cycles = parse_billing_cycles(totals.index)
+        order = np.argsort(cycles, order=['year', 'month', 'fortnight'])
+        totals, cycles = totals.iloc[order], cycles[order]
+        current = cycles[-1]
+        quarter = (cycles['month'] - 1) // 3
+        in_qtd = (cycles['year'] == current['year']) & (quarter == (current['month'] - 1) // 3)
+
+        overall = totals.sum()
+        qtd = totals[in_qtd].sum()
+        latest = totals.iloc[-1]
+        return KpiSnapshot(
+            total_invoices=int(overall['Invoices']),
+            settled_invoices=int(overall['Settled']),
+            unsettled_invoices=int(overall['Unsettled']),
+            current_cycle=str(totals.index[-1]),
+            current_cycle_pending_invoices=int(latest['Pending']),
+            current_cycle_pending_receivables=round(float(latest['Pending Receivables']), 2),
+            qtd_pending_invoices=int(qtd['Pending']),
+            qtd_pending_receivables=round(float(qtd['Pending Receivables']), 2),
+            rate_disputes=int(overall['Rate Disputes']),
+            volume_disputes=int(overall['Volume Disputes']),
+            ongoing_rate_disputes=int(overall['Ongoing Rate Disputes']),
+            ongoing_volume_disputes=int(overall['Ongoing Volume Disputes']),
+            total_disputed_amount=round(float(overall['Disputed Amount']), 2),
+        )
+
+
+def compute_kpis(rows):
+    """
+    KpiSnapshot for a filtered view (raw invoices or cube cells).
+    """
+    return KpiAccumulator().update(rows).snapshot()
@@ -0,0 +1,112 @@
+import numpy as np
+import pandas as pd
+
+from cube import rollup
+from data_generator import OPERATOR, generate_interconnect_obligations
+
+
+LEDGER_COLUMNS = ['Billing Cycle', 'Debtor', 'Creditor', 'Amount (USD)']
+
+POSITION_KEYS = ['Participant', 'Billing Cycle']
+
+
+def settlement_ledger(cube, seed=42):
+    """
+    Settlement obligations for the invoices in a reconciliation cube.
+
+    What each carrier owes OPERATOR per billing cycle is its invoiced amount
+    net of disputes; what OPERATOR owes the carriers and what they owe each
+    other for transit come from generate_interconnect_obligations.
+    """
+    receivables = rollup(cube, ['Carrier Name', 'Billing Cycle'], ['Invoice Amount (USD)', 'Disputed Amount (USD)'])
+    receivables = pd.DataFrame({
+        'Carrier Name': receivables['Carrier Name'].astype(str).to_numpy(dtype=object),
+        'Billing Cycle': receivables['Billing Cycle'].astype(str).to_numpy(dtype=object),
+        'Amount (USD)': np.round(
+            receivables['Invoice Amount (USD)'].to_numpy() - receivables['Disputed Amount (USD)'].to_numpy(), 2
+        ),
+    }).sort_values(['Carrier Name', 'Billing Cycle'], ignore_index=True)  # same ledger whatever the cube's row order
+    owed_to_operator = receivables.rename(columns={'Carrier Name': 'Debtor'}).assign(Creditor=OPERATOR)
+    return pd.concat(
+        [owed_to_operator[LEDGER_COLUMNS], generate_interconnect_obligations(receivables, seed=seed)],
+        ignore_index=True,
+    )
+
+
+class SettlementNetting:
+    """
+    Bilateral and multilateral netting of a settlement ledger.
+
+    Every billing cycle is a sparse participant x participant matrix of
+    gross obligations (row owes column). All cycles are stacked into one
+    (cycles * participants) x participants CSR matrix, so each step is a
+    single vectorized operation whatever the number of cycles; duplicate
+    ledger entries are summed on construction.
+
+    - bilateral: each pair settles the difference of what they owe each other
+    - multilateral: each participant settles its net position against everyone
+      (what it is owed minus what it owes) with a central counterparty
+    """
+
+    def __init__(self, ledger):
+        from scipy import sparse  # deferred to the first netting, off the import path of the app
+
+        participants = pd.Index(pd.unique(np.concatenate([
+            ledger['Debtor'].to_numpy(dtype=object), ledger['Creditor'].to_numpy(dtype=object)
+        ])))
+        cycles = pd.Index(np.sort(pd.unique(ledger['Billing Cycle'].to_numpy(dtype=object))))
+        debtor = participants.get_indexer(ledger['Debtor'])
+        creditor = participants.get_indexer(ledger['Creditor'])
+        cycle = cycles.get_indexer(ledger['Billing Cycle'])
+        amount = ledger['Amount (USD)'].to_numpy(dtype=np.float64)
+
+        self.participants = participants
+        self.cycles = cycles
+        n, shape = len(participants), (len(cycles) * len(participants), len(participants))
+        # gross[(c, i), j]: what i owes j in cycle c; owed[(c, i), j]: what j owes i
+        self.gross = sparse.csr_matrix((amount, (cycle * n + debtor, creditor)), shape=shape)
+        self.owed = sparse.csr_matrix((amount, (cycle * n + creditor, debtor)), shape=shape)
+        # Antisymmetric per cycle; a positive entry is what i still pays j after netting the pair
+        self.bilateral = (self.gross - self.owed).tocsr()
+        self.bilateral.eliminate_zeros()
+
+        payable = np.asarray(self.gross.sum(axis=1)).ravel()
+        receivable = np.asarray(self.owed.sum(axis=1)).ravel()
+        self.positions = pd.DataFrame({
+            'Receivable (USD)': receivable,
+            'Payable (USD)': payable,
+            'Net Position (USD)': receivable - payable,
+        }, index=pd.MultiIndex.from_product([cycles, participants], names=POSITION_KEYS[::-1]).swaplevel())
+
+    def counterparty(self, participant):
+        """
+        Gross and bilaterally netted amounts between `participant` and every other
+        participant per billing cycle, indexed by (other participant, cycle).
+
+        'Receivables' is what the other party owes `participant`, 'Payables' what
+        `participant` owes it, and 'Netted Amount' the difference settled between them.
+        """
+        column = self.participants.get_loc(participant)
+        owed_to = self.gross[:, column].toarray().ravel()      # (c, other) owes participant
+        owes = self.owed[:, column].toarray().ravel()          # participant owes (c, other)
+        others = self.positions.index
+        table = pd.DataFrame({
+            'Receivables': owed_to, 'Payables': owes, 'Netted Amount': owed_to - owes,
+        }, index=others)
+        return table.drop(index=participant, level='Participant')
+
+    def efficiency(self):
+        """
+        Per billing cycle, the total that changes hands when settling gross, bilaterally and multilaterally.
+        """
+        n = len(self.participants)
+        cycle_of_row = np.repeat(np.arange(len(self.cycles)), n)
+        gross = np.bincount(cycle_of_row, weights=np.asarray(self.gross.sum(axis=1)).ravel(), minlength=len(self.cycles))
+        positive = self.bilateral.multiply(self.bilateral > 0).tocsr()
+        bilateral = np.bincount(cycle_of_row, weights=np.asarray(positive.sum(axis=1)).ravel(), minlength=len(self.cycles))
+        net = self.positions['Net Position (USD)'].to_numpy()
+        multilateral = np.bincount(cycle_of_row, weights=np.clip(net, 0, None), minlength=len(self.cycles))
+        return pd.DataFrame({
+            'Billing Cycle': self.cycles, 'Gross (USD)': gross,
+            'Bilateral (USD)': bilateral, 'Multilateral (USD)': multilateral,
+        })
@@ -0,0 +1,142 @@
+import argparse
+
+import numpy as np
+import pandas as pd
+
+from data_generator import (
+    DISPUTE_TYPES, RECONCILIATION_STATUSES, SETTLEMENT_STATUSES, iter_invoice_chunks
+)
+
+
+# Status columns have a fixed vocabulary; carriers are discovered from the data
+STATUS_CATEGORIES = {
+    'Reconciliation Status': RECONCILIATION_STATUSES,
+    'Dispute Type': DISPUTE_TYPES,
+    'Settlement Status': SETTLEMENT_STATUSES,
+}
+
+# Structured (year, month, fortnight) representation of a 'YYYY-MM-F' billing cycle
+BILLING_CYCLE_DTYPE = np.dtype([('year', np.int16), ('month', np.int8), ('fortnight', np.int8)])
+
+# Minutes tolerate single precision; currency stays float64 so totals are cent-exact
+FLOAT32_COLUMNS = ['Usage (Mins)', 'Disputed Usage (Mins)']
+
+
+def parse_billing_cycles(labels):
+    """
+    Parse 'YYYY-MM-F' labels into a BILLING_CYCLE_DTYPE structured array.
+    """
+    parts = pd.Series(labels, dtype=object).str.split('-', expand=True).astype(int).to_numpy()
+    cycles = np.empty(len(parts), dtype=BILLING_CYCLE_DTYPE)
+    if len(parts):
+        cycles['year'], cycles['month'], cycles['fortnight'] = parts[:, 0], parts[:, 1], parts[:, 2]
+    return cycles
+
+
+def billing_cycle_parts(billing_cycle):
+    """
+    Structured (year, month, fortnight) array for a categorical 'Billing Cycle' column.
+
+    Only the categories are parsed; rows are mapped through their codes.
+    """
+    parsed = parse_billing_cycles(billing_cycle.cat.categories)
+    return parsed[billing_cycle.cat.codes.to_numpy()]
+
+
+def _billing_cycle_categorical(values):
+    """
+    Ordered categorical whose categories sort chronologically, so max()/min() and
+    range comparisons work directly on the codes.
+    """
+    codes, uniques = pd.factorize(values)
+    order = np.argsort(parse_billing_cycles(uniques), order=['year', 'month', 'fortnight'])
+    remap = np.empty(len(order), dtype=np.int32)
+    remap[order] = np.arange(len(order))
+    codes = np.where(codes >= 0, remap[codes], -1)
+    return pd.Categorical.from_codes(codes, categories=uniques[order], ordered=True)
+
+
+def _invoice_month_periods(values):
+    codes, uniques = pd.factorize(values)
+    return pd.PeriodIndex(uniques, freq='M').take(codes, allow_fill=True, fill_value=pd.NaT).array
+
+
+def normalize_invoice_frame(df):
+    """
+    Convert a raw invoice frame to its compact typed representation.
+
+    - carrier and status columns become categoricals
+    - 'Invoice Month' becomes Period[M]
+    - 'Billing Cycle' becomes a chronologically ordered categorical
+      (see billing_cycle_parts for the structured year/month/fortnight view)
+    - 'Invoice Number' is stored as an Arrow-backed string
+    - minute columns are downcast to float32
+    """
+    out = {}
+    for col in df.columns:
+        values = df[col]
+        if col == 'Carrier Name':
+            codes, uniques = pd.factorize(values)
+            out[col] = pd.Categorical.from_codes(codes, categories=uniques)
+        elif col in STATUS_CATEGORIES:
+            out[col] = pd.Categorical(values, categories=STATUS_CATEGORIES[col])
+        elif col == 'Invoice Month':
+            out[col] = _invoice_month_periods(values)
+        elif col == 'Billing Cycle':
+            out[col] = _billing_cycle_categorical(values)
+        elif col == 'Invoice Number':
+            out[col] = pd.array(values, dtype="string[pyarrow]")
+        elif col in FLOAT32_COLUMNS:
+            out[col] = values.to_numpy(dtype=np.float32)
+        else:
+            out[col] = values.to_numpy()
+    return pd.DataFrame(out, index=df.index)
+
+
+def concat_normalized(frames):
+    """
+    Concatenate normalized chunks without falling back to object dtype.
+
+    Chunks may have seen different carriers or billing cycles, so categorical
+    columns are recoded to the union of categories before concatenating.
+    """
+    frames = list(frames)
+    if len(frames) == 1:
+        return frames[0]
+    for col in ['Carrier Name', 'Billing Cycle']:
+        if col not in frames[0].columns:
+            continue
+        categories = pd.Index(pd.unique(np.concatenate([f[col].cat.categories.to_numpy() for f in frames])))
+        if col == 'Billing Cycle':
+            categories = categories[np.argsort(parse_billing_cycles(categories),
+                                               order=['year', 'month', 'fortnight'])]
+        frames = [f.assign(**{col: f[col].cat.set_categories(categories)}) for f in frames]
+    return pd.concat(frames, copy=False)
+
+
+def memory_report(before, after):
+    """
+    Per-column memory footprint (MB) of a raw frame and its normalized form.
+    """
+    mb_before = before.memory_usage(deep=True, index=False) / 1024 ** 2
+    mb_after = after.memory_usage(deep=True, index=False) / 1024 ** 2
+    report = pd.DataFrame({
+        'Dtype Before': before.dtypes.astype(str),
+        'Dtype After': after.dtypes.astype(str),
+        'Before (MB)': mb_before,
+        'After (MB)': mb_after,
+    })
+    report.loc['Total'] = ['', '', mb_before.sum(), mb_after.sum()]
+    report['Reduction'] = np.round(report['Before (MB)'] / report['After (MB)'], 1)
+    return report
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Report memory saved by normalizing the invoice frame.")
+    parser.add_argument("--carriers", type=int, default=100)
+    parser.add_argument("--months", type=int, default=12)
+    parser.add_argument("--rows-per-carrier", type=int, default=100)
+    args = parser.parse_args()
+
+    raw = pd.concat(iter_invoice_chunks(args.carriers, args.months, args.rows_per_carrier))
+    print(memory_report(raw, normalize_invoice_frame(raw)).round(2).to_string())
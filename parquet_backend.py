@@ -0,0 +1,212 @@
+import argparse
+import functools
+import re
+import uuid
+
+import pandas as pd
+import pyarrow as pa
+import pyarrow.dataset as ds
+
+from cube import CUBE_COUNTS, CUBE_DIMENSIONS, CUBE_MEASURES
+from normalize import normalize_invoice_frame
+
+
+# Directory layout: <root>/Invoice Month=2024-01/Carrier Name=Carrier 1/part-0.parquet
+PARTITION_COLUMNS = ['Invoice Month', 'Carrier Name']
+
+# Filtered row counts and cubes kept per store; keys are the (immutable) filter state
+QUERY_CACHE_SIZE = 32
+
+
+def _natural_key(value):
+    return [int(part) if part.isdigit() else part for part in re.split(r'(\d+)', str(value))]
+
+
+def _partition_filter(carriers=None, months=None):
+    """
+    Dataset filter for a carrier/month selection (None = no filter), pruned
+    to partition directories before any file is opened.
+    """
+    expression = None
+    for column, selected in (('Carrier Name', carriers), ('Invoice Month', months)):
+        if selected is None:
+            continue
+        term = ds.field(column).isin(pa.array([str(value) for value in selected], type=pa.string()))
+        expression = term if expression is None else expression & term
+    return expression
+
+
+def _decode_dictionaries(data):
+    """
+    Cast dictionary-encoded (partition) columns of an Arrow table or batch to plain strings.
+
+    normalize_invoice_frame builds its categoricals from the values present;
+    handing it pandas categoricals that carry the whole partition dictionary
+    would mislabel them.
+    """
+    return data.cast(pa.schema([
+        pa.field(field.name, pa.string() if pa.types.is_dictionary(field.type) else field.type)
+        for field in data.schema
+    ]))
+
+
+def write_partitioned(invoices, root, append_tag=None):
+    """
+    Write an invoice frame as Parquet files partitioned by invoice month and carrier.
+
+    By default the partitions written replace what was there. With
+    `append_tag`, files named after the tag are added next to the existing
+    ones instead, e.g. a second billing cycle landing in an existing month.
+    Appended file names also carry a random suffix, so an append never
+    overwrites another one, including one made before a restart.
+    """
+    table = pa.Table.from_pandas(
+        invoices.assign(**{col: invoices[col].astype(str) for col in PARTITION_COLUMNS}), preserve_index=False
+    )
+    partitioning = ds.partitioning(pa.schema([(col, pa.string()) for col in PARTITION_COLUMNS]), flavor='hive')
+    if append_tag is None:
+        ds.write_dataset(table, root, format='parquet', partitioning=partitioning,
+                         existing_data_behavior='delete_matching')
+    else:
+        ds.write_dataset(table, root, format='parquet', partitioning=partitioning,
+                         basename_template=f"{append_tag}-{uuid.uuid4().hex}-{{i}}.parquet", existing_data_behavior='overwrite_or_ignore')
+
+
+class ParquetView:
+    """
+    Filtered invoices in a ParquetInvoiceStore, read only when a frame is requested.
+
+    Mirrors FilterView, so the tabs can page through it the same way.
+    """
+
+    def __init__(self, store, carriers=None, months=None):
+        self.store = store
+        self.carriers = carriers
+        self.months = months
+
+    def __len__(self):
+        return self.store.count_rows(self.carriers, self.months)
+
+    @property
+    def empty(self):
+        return len(self) == 0
+
+    @property
+    def columns(self):
+        return pd.Index(self.store.dataset.schema.names)
+
+    def frame(self, columns=None):
+        return self.store.rows(self.carriers, self.months, columns)
+
+    def take(self, positions, columns=None):
+        return self.store.take(self.carriers, self.months, positions, columns)
+
+    def iter_chunks(self, chunk_rows, columns=None):
+        return self.store.iter_rows(self.carriers, self.months, columns, chunk_rows)
+
+
+class ParquetInvoiceStore:
+    """
+    Invoices kept as partitioned Parquet and queried through pyarrow.dataset.
+
+    Carrier and month filters prune partition directories, only the columns
+    a query needs are read, and the cube group-by runs inside Arrow, so the
+    full dataset never has to fit in memory. Exposes the same `values`,
+    `values_between` and `select` interface as FilterIndex. Row counts and
+    cubes are cached per filter state and must be treated as read-only; rows
+    are read on every request, so page through them with `take`.
+    """
+
+    def __init__(self, root):
+        self.root = root
+        self.dataset = ds.dataset(root, format='parquet', partitioning=ds.HivePartitioning.discover(
+            infer_dictionary=True))
+        # Filter options come from the partition directory names, without reading any data
+        dictionaries = dict(zip(self.dataset.partitioning.schema.names, self.dataset.partitioning.dictionaries))
+        self.values = {
+            'Carrier Name': pd.Index(sorted(dictionaries['Carrier Name'].to_pylist(), key=_natural_key)),
+            'Invoice Month': pd.PeriodIndex(sorted(dictionaries['Invoice Month'].to_pylist()), freq='M'),
+        }
+        # Per-store caches, so results are dropped along with the store
+        self.count_rows = functools.lru_cache(maxsize=QUERY_CACHE_SIZE)(self._count_rows)
+        self._cube = functools.lru_cache(maxsize=QUERY_CACHE_SIZE)(self._query_cube)
+
+    @staticmethod
+    def _key(selected):
+        return None if selected is None else tuple(sorted(str(value) for value in selected))
+
+    def values_between(self, col, low, high):
+        values = self.values[col]
+        return list(values[(values >= low) & (values <= high)])
+
+    def select(self, filters):
+        """
+        ParquetView for {'Carrier Name': ..., 'Invoice Month': ...} (None = unfiltered).
+        """
+        return ParquetView(self, self._key(filters.get('Carrier Name')), self._key(filters.get('Invoice Month')))
+
+    def _count_rows(self, carriers=None, months=None):
+        return self.dataset.count_rows(filter=_partition_filter(carriers, months))
+
+    def rows(self, carriers=None, months=None, columns=None):
+        """
+        Normalized invoice rows for a filter state, reading only `columns`.
+        """
+        table = self.dataset.to_table(
+            columns=None if columns is None else list(columns), filter=_partition_filter(carriers, months)
+        )
+        return normalize_invoice_frame(_decode_dictionaries(table).to_pandas())
+
+    def take(self, carriers=None, months=None, positions=(), columns=None):
+        """
+        Normalized rows at `positions` (in that order) among the rows of a filter state, e.g. one table page.
+        """
+        table = self.dataset.take(
+            pa.array(positions, type=pa.int64()), columns=None if columns is None else list(columns),
+            filter=_partition_filter(carriers, months),
+        )
+        return normalize_invoice_frame(_decode_dictionaries(table).to_pandas())
+
+    def iter_rows(self, carriers=None, months=None, columns=None, chunk_rows=None):
+        """
+        Normalized invoice rows for a filter state, streamed as frames of at most `chunk_rows` rows.
+        """
+        batches = self.dataset.to_batches(
+            columns=None if columns is None else list(columns), filter=_partition_filter(carriers, months),
+            **({} if chunk_rows is None else {'batch_size': chunk_rows}),
+        )
+        for batch in batches:
+            if batch.num_rows:
+                yield normalize_invoice_frame(_decode_dictionaries(batch).to_pandas())
+
+    def _query_cube(self, carriers, months):
+        measures = [col for col in CUBE_MEASURES if col in self.dataset.schema.names]
+        projection = {col: ds.field(col) for col in CUBE_DIMENSIONS + measures}
+        projection['Disputed'] = (ds.field('Disputed Amount (USD)') > 0).cast(pa.int64())
+        table = self.dataset.to_table(columns=projection, filter=_partition_filter(carriers, months))
+        table = _decode_dictionaries(table)
+        grouped = table.group_by(CUBE_DIMENSIONS).aggregate(
+            [(col, 'sum') for col in measures] + [([], 'count_all'), ('Disputed', 'sum')]
+        )
+        cube = grouped.to_pandas()
+        cube = cube.rename(columns={f'{col}_sum': col for col in measures})
+        cube = cube.rename(columns={'count_all': CUBE_COUNTS[0], 'Disputed_sum': CUBE_COUNTS[1]})
+        # Normalizing types the dimensions like the in-memory cube; measures stay float64
+        cube = normalize_invoice_frame(cube[CUBE_DIMENSIONS + measures + CUBE_COUNTS])
+        return cube.assign(**{col: cube[col].astype('float64') for col in measures})
+
+    def cube(self, carriers=None, months=None):
+        """
+        Reconciliation cube (as build_reconciliation_cube) for the selected carriers and months.
+        """
+        return self._cube(self._key(carriers), self._key(months))
+
+
+if __name__ == "__main__":
+    from data_layer import DATASET_CONFIG, build_invoice_data
+
+    parser = argparse.ArgumentParser(description="Write the configured invoice dataset as partitioned Parquet.")
+    parser.add_argument("root", help="Output directory")
+    args = parser.parse_args()
+    write_partitioned(build_invoice_data(), args.root)
+    print(f"Wrote {DATASET_CONFIG} to {args.root}")
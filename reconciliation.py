@@ -0,0 +1,214 @@
+import multiprocessing
+import os
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass
+
+import numpy as np
+import pandas as pd
+
+from data_generator import DISPUTE_TYPES, RECONCILIATION_STATUSES, SETTLEMENT_STATUSES
+from normalize import STATUS_CATEGORIES
+
+
+# Below this many invoices + usage records, reconcile in-process; the pool's startup costs more
+PARALLEL_MIN_ROWS = 5_000_000
+
+RECONCILIATION_KEYS = ['Carrier Name', 'Billing Cycle']
+
+VARIANCE_COLUMNS = [
+    'Carrier Name', 'Billing Cycle', 'Invoices', 'Usage Records',
+    'Billed Amount (USD)', 'Rated Amount (USD)', 'Billed Usage (Mins)', 'Rated Usage (Mins)',
+    'Amount Variance (USD)', 'Volume Variance (USD)', 'Rate Variance (USD)',
+    'Reconciliation Status', 'Dispute Type', 'Disputed Amount (USD)', 'Disputed Usage (Mins)',
+]
+
+_PENDING = RECONCILIATION_STATUSES.index('Pending')
+_COMPLETED = RECONCILIATION_STATUSES.index('Completed')
+_IN_PROGRESS = RECONCILIATION_STATUSES.index('In Progress')
+_RATE = DISPUTE_TYPES.index('Rate Dispute')
+_VOLUME = DISPUTE_TYPES.index('Volume Dispute')
+_SETTLED = SETTLEMENT_STATUSES.index('Settled')
+_UNSETTLED = SETTLEMENT_STATUSES.index('Unsettled')
+
+
+@dataclass(frozen=True)
+class ToleranceRules:
+    """
+    When a (carrier, billing cycle) is disputed.
+
+    A cycle is disputed when the carrier bills more than `amount_tolerance`
+    above our rated amount and either the billed minutes differ from our
+    usage by more than `volume_tolerance`, or the billed per-minute rate
+    differs from our rate by more than `rate_tolerance` (both relative).
+    The larger of the two variance components names the dispute type.
+    """
+    volume_tolerance: float = 0.02
+    rate_tolerance: float = 0.01
+    amount_tolerance: float = 1.00
+
+
+DEFAULT_RULES = ToleranceRules()
+
+
+def _safe_divide(numerator, denominator):
+    # float output even for bincount's int64 result over a partition without matched usage
+    return np.divide(numerator, denominator, out=np.zeros(np.shape(numerator), dtype=np.float64), where=denominator != 0)
+
+
+def _reconcile_partition(inv_keys, inv_amount, inv_mins, use_keys, use_amount, use_mins, rules):
+    """
+    Hash-join one partition's invoices with its usage records on the
+    (carrier, billing cycle) key and classify every key.
+
+    Keys are integers; the invoice side is the build side and usage records
+    probe it. Returns per-invoice outcomes and per-key variances.
+    """
+    inv_key_idx, key_values = pd.factorize(inv_keys)
+    n_keys = len(key_values)
+    probe = pd.Index(key_values).get_indexer(use_keys)
+    matched = probe >= 0
+
+    billed_amount = np.bincount(inv_key_idx, weights=inv_amount, minlength=n_keys)
+    billed_mins = np.bincount(inv_key_idx, weights=inv_mins, minlength=n_keys)
+    invoices = np.bincount(inv_key_idx, minlength=n_keys)
+    rated_amount = np.bincount(probe[matched], weights=use_amount[matched], minlength=n_keys)
+    rated_mins = np.bincount(probe[matched], weights=use_mins[matched], minlength=n_keys)
+    records = np.bincount(probe[matched], minlength=n_keys)
+
+    # Amount variance splits exactly into a volume part (extra minutes at our
+    # rate) and a rate part (the rate difference over all billed minutes)
+    our_rate = _safe_divide(rated_amount, rated_mins)
+    billed_rate = _safe_divide(billed_amount, billed_mins)
+    amount_variance = billed_amount - rated_amount
+    volume_variance = (billed_mins - rated_mins) * our_rate
+    rate_variance = (billed_rate - our_rate) * billed_mins
+
+    has_usage = records > 0
+    volume_breach = np.abs(billed_mins - rated_mins) > rules.volume_tolerance * rated_mins
+    rate_breach = np.abs(billed_rate - our_rate) > rules.rate_tolerance * our_rate
+    disputed = has_usage & (amount_variance > rules.amount_tolerance) & (volume_breach | rate_breach)
+    is_rate = rate_breach & (~volume_breach | (np.abs(rate_variance) >= np.abs(volume_variance)))
+
+    status = np.where(has_usage, np.where(disputed, _IN_PROGRESS, _COMPLETED), _PENDING).astype(np.int8)
+    dispute_type = np.where(disputed, np.where(is_rate, _RATE, _VOLUME), -1).astype(np.int8)
+    disputed_amount = np.where(disputed, amount_variance, 0.0)
+    # Rate disputes cover every billed minute; volume disputes only the excess
+    disputed_mins = np.where(disputed, np.where(is_rate, billed_mins, np.maximum(billed_mins - rated_mins, 0)), 0.0)
+
+    # Allocate key-level outcomes to invoices in proportion to their share of the key
+    amount_share = _safe_divide(inv_amount, billed_amount[inv_key_idx])
+    mins_share = _safe_divide(inv_mins, billed_mins[inv_key_idx])
+    per_invoice = {
+        'status': status[inv_key_idx],
+        'dispute_type': dispute_type[inv_key_idx],
+        'disputed_amount': np.round(disputed_amount[inv_key_idx] * amount_share, 2),
+        'disputed_mins': np.round(disputed_mins[inv_key_idx] * mins_share, 2),
+    }
+    per_key = {
+        'key': key_values, 'Invoices': invoices, 'Usage Records': records,
+        'Billed Amount (USD)': billed_amount, 'Rated Amount (USD)': rated_amount,
+        'Billed Usage (Mins)': billed_mins, 'Rated Usage (Mins)': rated_mins,
+        'Amount Variance (USD)': amount_variance, 'Volume Variance (USD)': volume_variance,
+        'Rate Variance (USD)': rate_variance, 'status': status, 'dispute_type': dispute_type,
+        'Disputed Amount (USD)': disputed_amount, 'Disputed Usage (Mins)': disputed_mins,
+    }
+    return per_invoice, per_key
+
+
+def _key_codes(frame, carriers, cycles):
+    """
+    One int64 key per row from the carrier and billing-cycle codes against shared categories (-1 if unknown).
+    """
+    carrier = pd.Categorical(frame['Carrier Name'], categories=carriers).codes.astype(np.int64)
+    cycle = pd.Categorical(frame['Billing Cycle'], categories=cycles).codes.astype(np.int64)
+    return np.where((carrier >= 0) & (cycle >= 0), carrier * len(cycles) + cycle, -1), carrier
+
+
+def _executor(max_workers):
+    # spawn: forking a process that runs Streamlit's threads is not safe
+    return ProcessPoolExecutor(max_workers=max_workers, mp_context=multiprocessing.get_context("spawn"))
+
+
+def reconcile_invoices(invoices, usage, rules=DEFAULT_RULES, max_workers=None):
+    """
+    Match invoices against internal usage/rating records per (carrier, billing cycle).
+
+    `usage` holds 'Carrier Name', 'Billing Cycle', 'Usage (Mins)' and
+    'Rated Amount (USD)', one row per usage record. Carriers are split into
+    partitions reconciled in a process pool (`max_workers` defaults to the CPU
+    count; 1, or a small input, reconciles in-process).
+
+    Returns the invoices with 'Reconciliation Status', 'Dispute Type',
+    'Settlement Status', 'Disputed Amount (USD)' and 'Disputed Usage (Mins)'
+    replaced (or added), and a per-key variance table. Keys without usage
+    records stay 'Pending'; only 'Completed' (undisputed) keys are 'Settled'.
+
+    Usage is only known per key, so every invoice of a disputed key is
+    disputed, and carries the key's disputed amount and minutes pro rata to
+    its own amount and minutes: an allocation, not an invoice-level finding.
+    """
+    carriers = invoices['Carrier Name'].astype('category').cat.categories
+    cycles = invoices['Billing Cycle'].astype('category').cat.categories
+    inv_keys, inv_carriers = _key_codes(invoices, carriers, cycles)
+    use_keys, use_carriers = _key_codes(usage, carriers, cycles)
+
+    columns = (
+        invoices['Invoice Amount (USD)'].to_numpy(dtype=np.float64),
+        invoices['Usage (Mins)'].to_numpy(dtype=np.float64),
+        usage['Rated Amount (USD)'].to_numpy(dtype=np.float64),
+        usage['Usage (Mins)'].to_numpy(dtype=np.float64),
+    )
+    max_workers = max_workers or os.cpu_count() or 1
+    if len(invoices) + len(usage) < PARALLEL_MIN_ROWS:
+        max_workers = 1
+    n_partitions = max(1, min(max_workers, len(carriers)))
+
+    # Partition by carrier so every key lands wholly in one partition
+    inv_parts = [np.flatnonzero(inv_carriers % n_partitions == p) for p in range(n_partitions)]
+    use_parts = [np.flatnonzero(use_carriers % n_partitions == p) for p in range(n_partitions)]
+    tasks = [
+        (inv_keys[inv], columns[0][inv], columns[1][inv], use_keys[use], columns[2][use], columns[3][use], rules)
+        for inv, use in zip(inv_parts, use_parts)
+    ]
+    if n_partitions == 1:
+        outcomes = [_reconcile_partition(*tasks[0])]
+    else:
+        with _executor(n_partitions) as pool:
+            outcomes = list(pool.map(_reconcile_partition, *zip(*tasks)))
+
+    status = np.empty(len(invoices), dtype=np.int8)
+    dispute_type = np.empty(len(invoices), dtype=np.int8)
+    disputed_amount = np.empty(len(invoices), dtype=np.float64)
+    disputed_mins = np.empty(len(invoices), dtype=np.float64)
+    for positions, (per_invoice, _) in zip(inv_parts, outcomes):
+        status[positions] = per_invoice['status']
+        dispute_type[positions] = per_invoice['dispute_type']
+        disputed_amount[positions] = per_invoice['disputed_amount']
+        disputed_mins[positions] = per_invoice['disputed_mins']
+
+    # Output columns, so invoices without them (e.g. the original 10-column layout) are accepted
+    mins_dtype = invoices['Disputed Usage (Mins)'].dtype if 'Disputed Usage (Mins)' in invoices.columns else np.float32
+    reconciled = invoices.assign(**{
+        'Reconciliation Status': pd.Categorical.from_codes(status, STATUS_CATEGORIES['Reconciliation Status']),
+        'Dispute Type': pd.Categorical.from_codes(dispute_type, STATUS_CATEGORIES['Dispute Type']),
+        'Settlement Status': pd.Categorical.from_codes(
+            np.where(status == _COMPLETED, _SETTLED, _UNSETTLED).astype(np.int8), STATUS_CATEGORIES['Settlement Status']
+        ),
+        'Disputed Amount (USD)': disputed_amount,
+        'Disputed Usage (Mins)': disputed_mins.astype(mins_dtype),
+    })
+    return reconciled, _variance_table([per_key for _, per_key in outcomes], carriers, cycles)
+
+
+def _variance_table(parts, carriers, cycles):
+    merged = {col: np.concatenate([part[col] for part in parts]) for col in parts[0]}
+    keys = merged.pop('key')
+    status, dispute_type = merged.pop('status'), merged.pop('dispute_type')
+    table = pd.DataFrame({
+        'Carrier Name': pd.Categorical.from_codes(keys // len(cycles), carriers),
+        'Billing Cycle': pd.Categorical.from_codes(keys % len(cycles), cycles),
+        **merged,
+        'Reconciliation Status': pd.Categorical.from_codes(status, STATUS_CATEGORIES['Reconciliation Status']),
+        'Dispute Type': pd.Categorical.from_codes(dispute_type, STATUS_CATEGORIES['Dispute Type']),
+    })
+    return table[VARIANCE_COLUMNS].sort_values(RECONCILIATION_KEYS, ignore_index=True)
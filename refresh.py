@@ -0,0 +1,245 @@
+import contextlib
+import json
+import os
+import sqlite3
+import sys
+import threading
+import time
+import traceback
+
+import pandas as pd
+
+from data_layer import BACKEND, PARQUET_ROOT, append_billing_cycle
+
+
+# New invoices are polled from here: a directory of dropped CSV/Parquet files,
+# or a SQLite file (.db/.sqlite/.sqlite3) with an invoices table. Unset = no refresh.
+REFRESH_SOURCE = os.environ.get("BILLING_REFRESH_SOURCE") or None
+REFRESH_TABLE = os.environ.get("BILLING_REFRESH_TABLE", "invoices")
+REFRESH_SECONDS = float(os.environ.get("BILLING_REFRESH_SECONDS", 30))
+
+# A dropped file that fails this many polls in a row is renamed with QUARANTINE_PREFIX and skipped
+REFRESH_MAX_ATTEMPTS = int(os.environ.get("BILLING_REFRESH_MAX_ATTEMPTS", 3))
+QUARANTINE_PREFIX = "_failed-"
+
+# Read as text so labels like '2024-01' are not parsed into numbers or dates
+TEXT_COLUMNS = [
+    'Invoice Number', 'Carrier Name', 'Reconciliation Status', 'Dispute Type', 'Settlement Status',
+    'Invoice Month', 'Billing Cycle',
+]
+
+SQLITE_SUFFIXES = ('.db', '.sqlite', '.sqlite3')
+
+
+class DirectorySource:
+    """
+    New invoice files (.csv or .parquet) dropped into a directory, one batch per file.
+
+    Each file is read until its rows have been appended (see commit). Write
+    files under a temporary name (leading '.' or '_', or a .tmp suffix) and
+    rename them when complete, so a file is never picked up half-written.
+    A file that fails REFRESH_MAX_ATTEMPTS polls in a row is renamed with
+    QUARANTINE_PREFIX, so it no longer holds up the files after it.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self.seen = set()
+        self.failures = {}
+
+    def _signature(self, name):
+        stat = os.stat(os.path.join(self.path, name))
+        return f"{name}:{stat.st_size}:{stat.st_mtime_ns}"
+
+    def new_batches(self):
+        """
+        (name, signature) of every unread file, oldest name first.
+        """
+        if not os.path.isdir(self.path):
+            return []
+        names = sorted(
+            name for name in os.listdir(self.path)
+            if name.endswith(('.csv', '.parquet')) and not name.startswith(('.', '_'))
+        )
+        batches = [(name, self._signature(name)) for name in names]
+        return [batch for batch in batches if batch[1] not in self.seen]
+
+    def read(self, batch):
+        path = os.path.join(self.path, batch[0])
+        if path.endswith('.parquet'):
+            return pd.read_parquet(path)
+        return pd.read_csv(path, dtype={col: str for col in TEXT_COLUMNS})
+
+    def commit(self, batch):
+        """
+        Mark a file as read once its rows have been appended.
+        """
+        self.seen.add(batch[1])
+        self.failures.pop(batch[1], None)
+
+    def fail(self, batch):
+        """
+        Count a failed attempt; returns the quarantined file name once the file is given up on.
+        """
+        name, signature = batch
+        self.failures[signature] = self.failures.get(signature, 0) + 1
+        if self.failures[signature] < REFRESH_MAX_ATTEMPTS:
+            return None
+        del self.failures[signature]
+        quarantined = f"{QUARANTINE_PREFIX}{name}"
+        os.replace(os.path.join(self.path, name), os.path.join(self.path, quarantined))
+        return quarantined
+
+    def state(self):
+        return {'seen': sorted(self.seen)}
+
+    def restore(self, state):
+        self.seen = set(state.get('seen', []))
+
+
+class SqliteSource:
+    """
+    Rows added to a SQLite table since the last committed read, tracked by rowid.
+
+    All new rows form a single batch, so a failed batch is retried whole.
+    """
+
+    def __init__(self, path, table=REFRESH_TABLE):
+        self.path = path
+        self.table = table
+        self.last_rowid = 0
+        self._pending_rowid = 0
+
+    def new_batches(self):
+        return [self.last_rowid] if os.path.exists(self.path) else []
+
+    def read(self, batch):
+        with contextlib.closing(sqlite3.connect(f"file:{self.path}?mode=ro", uri=True)) as conn:
+            try:
+                rows = pd.read_sql_query(
+                    f'SELECT rowid AS "_rowid", * FROM "{self.table}" WHERE rowid > ? ORDER BY rowid',
+                    conn, params=(batch,),
+                )
+            except pd.errors.DatabaseError:
+                return None  # table not created yet
+        if rows.empty:
+            return None
+        self._pending_rowid = int(rows['_rowid'].iloc[-1])
+        return rows.drop(columns='_rowid')
+
+    def commit(self, batch):
+        """
+        Mark the rows returned by the last read as read.
+        """
+        self.last_rowid = max(self.last_rowid, self._pending_rowid)
+
+    def fail(self, batch):
+        return None
+
+    def state(self):
+        return {'last_rowid': self.last_rowid}
+
+    def restore(self, state):
+        self.last_rowid = state.get('last_rowid', 0)
+
+
+def open_source(path):
+    if path.endswith(SQLITE_SUFFIXES):
+        return SqliteSource(path)
+    return DirectorySource(path)
+
+
+class RefreshWorker(threading.Thread):
+    """
+    Daemon thread that polls a source for new invoices and appends them as a new data version.
+
+    Each batch is folded in with append_billing_cycle on this thread while
+    sessions keep reading the current version; the next one is swapped in
+    atomically, so no session ever waits on the rebuild. Batches (one per
+    dropped file) are appended and marked as read one at a time: a failed
+    one is retried on the next poll instead of being dropped, without
+    holding up the batches after it, and quarantined files are listed in
+    `status`. With `state_path`, what has been
+    read is saved after every append and restored on start, so a restart
+    does not append the same invoices twice to data that persists (the
+    Parquet backend).
+    """
+
+    def __init__(self, source, interval=REFRESH_SECONDS, state_path=None):
+        super().__init__(name="billing-refresh", daemon=True)
+        self.source = source
+        self.interval = interval
+        self.state_path = state_path
+        self.status = {
+            'last_poll': None, 'last_refresh': None, 'rows': 0, 'version': None, 'error': None, 'quarantined': [],
+        }
+        self._stopped = threading.Event()
+        if state_path and os.path.exists(state_path):
+            with open(state_path) as f:
+                source.restore(json.load(f))
+
+    def _save_state(self):
+        tmp_path = f"{self.state_path}.tmp"
+        with open(tmp_path, "w") as f:
+            json.dump(self.source.state(), f)
+        os.replace(tmp_path, self.state_path)
+
+    def poll(self):
+        """
+        Append whatever is new in the source; returns the newest data version, or None.
+        """
+        self.status['last_poll'] = time.time()
+        version, rows, error = None, 0, None
+        try:
+            batches = self.source.new_batches()
+        except Exception as exc:
+            batches, error = [], f"{type(exc).__name__}: {exc}"
+            traceback.print_exc(file=sys.stderr)
+        for batch in batches:
+            try:
+                invoices = self.source.read(batch)
+                if invoices is not None and not invoices.empty:
+                    version = append_billing_cycle(invoices)
+                    rows += len(invoices)
+                self.source.commit(batch)
+                if self.state_path:
+                    self._save_state()
+            except Exception as exc:
+                error = f"{type(exc).__name__}: {exc}"
+                traceback.print_exc(file=sys.stderr)
+                quarantined = self.source.fail(batch)
+                if quarantined:
+                    self.status['quarantined'].append((quarantined, error))
+        if version is not None:
+            self.status.update(last_refresh=time.time(), rows=rows, version=version)
+        self.status['error'] = error
+        return version
+
+    def run(self):
+        while not self._stopped.is_set():
+            self.poll()
+            self._stopped.wait(self.interval)
+
+    def stop(self):
+        self._stopped.set()
+
+
+_worker = None
+_worker_lock = threading.Lock()
+
+
+def start_refresh_worker(source_path=REFRESH_SOURCE, interval=REFRESH_SECONDS):
+    """
+    Start the process-wide refresh worker once (None if no source is configured).
+
+    Later calls, e.g. from every session's script run, return the running worker.
+    """
+    global _worker
+    if not source_path:
+        return None
+    with _worker_lock:
+        if _worker is None:
+            state_path = os.path.join(PARQUET_ROOT, "_refresh_state.json") if BACKEND == "parquet" else None
+            _worker = RefreshWorker(open_source(source_path), interval, state_path)
+            _worker.start()
+    return _worker
@@ -0,0 +1,73 @@
+import argparse
+import json
+import os
+
+import pandas as pd
+import pyarrow as pa
+
+
+# Bump when the prepared frame's layout or how it is built changes, so old snapshots are rebuilt
+SNAPSHOT_FORMAT = 3
+
+_FINGERPRINT_KEY = b'billing.fingerprint'
+
+
+def save_snapshot(frame, path, fingerprint):
+    """
+    Write a prepared invoice frame as an uncompressed Arrow IPC file.
+
+    `fingerprint` (any JSON-serializable value describing how the frame was
+    built) is stored with it; load_snapshot only accepts a matching one.
+    The file is written under a temporary name and renamed, so workers
+    starting at the same time never read a partial snapshot.
+    """
+    table = pa.Table.from_pandas(frame, preserve_index=False)
+    metadata = {**(table.schema.metadata or {}), _FINGERPRINT_KEY: json.dumps([SNAPSHOT_FORMAT, fingerprint])}
+    table = table.replace_schema_metadata(metadata)
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    with pa.OSFile(tmp_path, 'wb') as sink, pa.ipc.new_file(sink, table.schema) as writer:
+        writer.write_table(table)
+    os.replace(tmp_path, path)
+
+
+def load_snapshot(path, fingerprint):
+    """
+    Memory-map a snapshot written by save_snapshot; None if it is missing or was built differently.
+
+    Column buffers stay in the mapped file: numeric columns are zero-copy
+    views, and the pages are shared through the OS page cache by every
+    process that maps the same file.
+    """
+    if not os.path.exists(path):
+        return None
+    source = pa.memory_map(path)
+    reader = pa.ipc.open_file(source)
+    stored = (reader.schema.metadata or {}).get(_FINGERPRINT_KEY)
+    if stored is None or json.loads(stored) != json.loads(json.dumps([SNAPSHOT_FORMAT, fingerprint])):
+        return None
+    # Strings stay Arrow-backed (as normalize_invoice_frame stores them) instead of becoming Python objects
+    strings = {pa.string(): pd.StringDtype("pyarrow"), pa.large_string(): pd.StringDtype("pyarrow")}
+    return reader.read_all().to_pandas(split_blocks=True, types_mapper=strings.get)
+
+
+def load_or_build(path, fingerprint, build):
+    """
+    The snapshot at `path` if it matches `fingerprint`, else `build()`, saved there for the next process.
+    """
+    frame = load_snapshot(path, fingerprint)
+    if frame is None:
+        frame = build()
+        save_snapshot(frame, path, fingerprint)
+    return frame
+
+
+if __name__ == "__main__":
+    from data_layer import SNAPSHOT_PATH, build_invoice_data, snapshot_fingerprint
+
+    parser = argparse.ArgumentParser(description="Write the configured invoice dataset as a memory-mappable snapshot.")
+    parser.add_argument("path", nargs="?", default=SNAPSHOT_PATH, help="Output file (default: BILLING_SNAPSHOT_PATH)")
+    args = parser.parse_args()
+    if not args.path:
+        parser.error("no path given and BILLING_SNAPSHOT_PATH is not set")
+    save_snapshot(build_invoice_data(), args.path, snapshot_fingerprint())
+    print(f"Wrote snapshot to {args.path}")
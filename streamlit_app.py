@@ -2,11 +2,24 @@
 import streamlit as st
 import pandas as pd
 import numpy as np
-import plotly.express as px
 import streamlit.components.v1 as components
 import base64
 import os
 
+from aggregations import group_mode, ratio, status_counts
+from charts import bucket_time_series, plot_serialized, serialize_figure, top_n_with_other
+from cube import rollup
+from data_generator import OPERATOR
+from exports import export_controls, frame_chunks
+from kpis import compute_kpis
+from tables import paginated_table
+from instrumentation import profile_section, profiled_run, set_profile_context
+from refresh import REFRESH_MAX_ATTEMPTS, REFRESH_SECONDS, start_refresh_worker
+from data_layer import (
+    current_data_version, get_filter_index, load_filter_index, load_kpi_accumulator, load_settlement_netting,
+    query_cube
+)
+
 
 # Page configuration
 st.set_page_config(layout="wide", page_title="Billing Reconciliation Dashboard")
@@ -42,114 +55,61 @@ display_page_logo()
 pd.options.display.float_format = "{:.2f}".format
 
 
-# Sample data generation (50 records) with both disputed and undisputed data
-def generate_sample_data():
-    np.random.seed(42)
-    months = pd.date_range(start="2024-01-01", periods=12, freq='M').strftime('%Y-%m').tolist()
-    carriers = [f'Carrier {i}' for i in range(1, 11)]  # 10 unique carriers
-    data = []
-    invoice_counter = 1  # To create sequential invoice numbers
-
-    for month in months:
-        for carrier in carriers:
-            invoice_amount = np.round(np.random.uniform(1000, 5000), 2)
-            is_disputed = np.random.rand() < 0.2
-            disputed_amount = np.round(np.random.uniform(0, invoice_amount * 0.3) if is_disputed else 0, 2)
-            billing_cycle = f'{2024}-{int(month[-2:]):02d}-{np.random.choice([1, 2])}'  # Format: Year-Month-Fortnight
-
-            # Generate a unique invoice number
-            invoice_number = f'{carrier.replace(" ", "")[:3].upper()}-{month.replace("-", "")}-{invoice_counter:04d}'
-            invoice_counter += 1
-
-            data.append({
-                'Invoice Number': invoice_number,
-                'Carrier Name': carrier,
-                'Invoice Amount (USD)': invoice_amount,
-                'Disputed Amount (USD)': disputed_amount,
-                'Reconciliation Status': np.random.choice(['Pending', 'Completed', 'In Progress']),
-                'Dispute Type': np.random.choice(['Rate Dispute', 'Volume Dispute']) if is_disputed else None,
-                'Settlement Status': np.random.choice(['Settled', 'Unsettled']) if is_disputed else 'Settled',
-                'Invoice Month': month,
-                'Billing Cycle': billing_cycle,
-                'Usage (Mins)': np.random.uniform(100, 500)  # Ensure 'Usage (Mins)' is included
-            })
-
-    return pd.DataFrame(data)
-
-
-df = generate_sample_data()
-df=df.round(2)
-
-
-# Dashboard title
-st.title("Billing Reconciliation Dashboard")
-
-# Filters
-carrier_filter = st.selectbox("Select Carrier (Optional)", options=["All"] + list(df['Carrier Name'].unique()))
-month_filter = st.selectbox("Select Month (Optional)", options=["All"] + list(df['Invoice Month'].unique()))
-
-# Applying filters (if selected) to data
-filtered_df = df.copy()
-filtered_df = filtered_df.round(2)
-if carrier_filter != "All":
-    filtered_df = filtered_df[filtered_df['Carrier Name'] == carrier_filter]
-if month_filter != "All":
-    filtered_df = filtered_df[filtered_df['Invoice Month'] == month_filter]
-
-# Function to create summary tables with specific fields and alignment
-def create_summary_table(data, columns):
-    table = data[columns].copy()
-    for col in ['Invoice Amount (USD)', 'Disputed Amount (USD)', 'Usage (Mins)']:
-        if col in table.columns:
-            table[col] = table[col].map("{:.2f}".format)
-    return table
-
-# Tabs
-tab1, tab2, tab3, tab4 = st.tabs(["Invoice Reconciliation", "Reconciliation Summary", "Dispute Summary", "Settlement Summary"])
+# Conditional styling for status columns, applied only to the visible page of a table
+SETTLEMENT_STATUS_STYLES = {
+    'Unsettled': 'color: red; font-weight: bold;',
+    'Pending': 'color: red; font-weight: bold;',
+    'Settled': 'color: green; font-weight: bold;',
+}
 
 
-# Tab 1: Invoice Reconciliation
-with tab1:
-    st.subheader("Invoice Reconciliation Overview")
+def apply_filters(data_version, carriers, months):
+    """
+    Filtered cube and lazy row view for a filter state.
 
-    # Add Compact Counter for Settled vs Unsettled Invoices
-    if not filtered_df.empty:
-        settled_count = filtered_df[filtered_df['Settlement Status'] == 'Settled'].shape[0]
-        unsettled_count = filtered_df[filtered_df['Settlement Status'] == 'Unsettled'].shape[0]
+    `carriers` and `months` are tuples of labels, or None for "All", so the
+    whole filter state can be used as a cache key.
+    """
+    carriers = None if carriers is None else list(carriers)
+    months = None if months is None else [pd.Period(month, freq='M') for month in months]
+    with profile_section("filtering"):
+        filtered_cube = query_cube(data_version, carriers, months)
+        filter_view = load_filter_index(data_version).select({'Carrier Name': carriers, 'Invoice Month': months})
+    return filtered_cube, filter_view
+
+
+# Every counter card reads from one KPI snapshot per filter state
+@st.cache_data(max_entries=64, show_spinner=False)
+def compute_kpi_snapshot(data_version, carriers, months):
+    if carriers is None and months is None:
+        return load_kpi_accumulator(data_version).snapshot()
+    filtered_cube, _ = apply_filters(data_version, carriers, months)
+    return compute_kpis(filtered_cube)
 
-   # Display the counts with a consistent, centered design
-    
-    st.markdown(
-        f"""
-        <div style="display: flex; justify-content: center; gap: 20px;">
-            <div style="text-align: center; padding: 15px; width: 260px; 
-                        border: 2px solid #007BFF; border-radius: 12px; 
-                        background: linear-gradient(135deg, #85C1E9, #EAF2F8); 
-                        box-shadow: 0px 4px 8px rgba(0, 0, 0, 0.1);">
-                <h5 style="color: #FF4D4D; margin: 0; font-size: 1.2em;">✅ Settled</h5>
-                <p style="margin: 10px 0; color: #1E4DD8; font-size: 1.5em; font-weight: bold;">
-                    {settled_count} Invoices
-                </p>
-            </div>
-            <div style="text-align: center; padding: 15px; width: 260px; 
-                        border: 2px solid #FF5733; border-radius: 12px; 
-                        background: linear-gradient(135deg, #F5B7B1, #FDEDEC); 
-                        box-shadow: 0px 4px 8px rgba(0, 0, 0, 0.1);">
-                <h5 style="color: #FF4D4D; margin: 0; font-size: 1.2em;">❌ Unsettled</h5>
-                <p style="margin: 10px 0; color: #1E4DD8; font-size: 1.5em; font-weight: bold;">
-                    {unsettled_count} Invoices
-                </p>
-            </div>
-        </div>
-        """,
-        unsafe_allow_html=True,
-    )
 
+# Each tab is split into a memoized compute step, keyed by (data version,
+# filter state), and a render step. Only the active tab runs either.
+# Charts are fed aggregated, size-bounded data and cached as Plotly JSON.
+# plotly.express is imported inside the compute steps, so a process only
+# pays for it once a chart is actually built, not before the first paint.
+
+# Tab 1: Invoice Reconciliation
+@st.cache_data(max_entries=64, show_spinner=False)
+def compute_invoice_reconciliation(data_version, carriers, months):
+    import plotly.express as px
+
+    filtered_cube, _ = apply_filters(data_version, carriers, months)
+    results = {}
 
     # Chart: Disputed vs Processed Amounts by Carrier
-    if not filtered_df.empty:
+    results['processed_vs_disputed'] = None
+    if not filtered_cube.empty:
+        carrier_amounts = top_n_with_other(
+            rollup(filtered_cube, 'Carrier Name', ['Invoice Amount (USD)', 'Disputed Amount (USD)']),
+            'Carrier Name', ['Invoice Amount (USD)', 'Disputed Amount (USD)']
+        )
         processed_vs_disputed = px.bar(
-            filtered_df, x='Carrier Name', y=['Invoice Amount (USD)', 'Disputed Amount (USD)'],
+            carrier_amounts, x='Carrier Name', y=['Invoice Amount (USD)', 'Disputed Amount (USD)'],
             title="Disputed vs Processed Amounts by Carrier", barmode="group", labels={
                 "Carrier Name": "Carrier", "value": "Amount (USD)"}
         )
@@ -161,98 +121,198 @@ with tab1:
                 'x': 0.25
             }
         )
-        st.plotly_chart(processed_vs_disputed)
+        results['processed_vs_disputed'] = serialize_figure(processed_vs_disputed)
 
     # Chart: Invoice Disputes by Month
-    monthly_disputes = filtered_df.round(2).groupby('Invoice Month').agg({
-        'Invoice Amount (USD)': 'sum', 'Disputed Amount (USD)': 'sum'}).reset_index()
+    monthly_disputes = bucket_time_series(
+        rollup(filtered_cube, 'Invoice Month', ['Invoice Amount (USD)', 'Disputed Amount (USD)']),
+        'Invoice Month', ['Invoice Amount (USD)', 'Disputed Amount (USD)']
+    )
     monthly_disputes = np.round(monthly_disputes, 2)
     monthly_disputes_fig = px.line(
-        monthly_disputes.round(2), x='Invoice Month', y=['Invoice Amount (USD)', 'Disputed Amount (USD)'],
+        monthly_disputes, x='Invoice Month', y=['Invoice Amount (USD)', 'Disputed Amount (USD)'],
         title="Invoice Disputes by Month", labels={"value": "Amount (USD)"}
     )
 
     monthly_disputes_fig.update_layout(
-        title={ 
+        title={
             'text': "Invoice Disputes by Month",
                 'font': {'size': 24},
                 'x': 0.25
             }
         )
-    st.plotly_chart(monthly_disputes_fig)
+    results['monthly_disputes_fig'] = serialize_figure(monthly_disputes_fig)
+    return results
+
+
+def render_invoice_reconciliation(data_version, carriers, months):
+    with profile_section("compute"):
+        results = compute_invoice_reconciliation(data_version, carriers, months)
+    with profile_section("counters"):
+        kpis = compute_kpi_snapshot(data_version, carriers, months)
+    st.subheader("Invoice Reconciliation Overview")
+
+   # Display the counts with a consistent, centered design
+
+    st.markdown(
+        f"""
+        <div style="display: flex; justify-content: center; gap: 20px;">
+            <div style="text-align: center; padding: 15px; width: 260px;
+                        border: 2px solid #007BFF; border-radius: 12px;
+                        background: linear-gradient(135deg, #85C1E9, #EAF2F8);
+                        box-shadow: 0px 4px 8px rgba(0, 0, 0, 0.1);">
+                <h5 style="color: #FF4D4D; margin: 0; font-size: 1.2em;">✅ Settled</h5>
+                <p style="margin: 10px 0; color: #1E4DD8; font-size: 1.5em; font-weight: bold;">
+                    {kpis.settled_invoices} Invoices
+                </p>
+            </div>
+            <div style="text-align: center; padding: 15px; width: 260px;
+                        border: 2px solid #FF5733; border-radius: 12px;
+                        background: linear-gradient(135deg, #F5B7B1, #FDEDEC);
+                        box-shadow: 0px 4px 8px rgba(0, 0, 0, 0.1);">
+                <h5 style="color: #FF4D4D; margin: 0; font-size: 1.2em;">❌ Unsettled</h5>
+                <p style="margin: 10px 0; color: #1E4DD8; font-size: 1.5em; font-weight: bold;">
+                    {kpis.unsettled_invoices} Invoices
+                </p>
+            </div>
+        </div>
+        """,
+        unsafe_allow_html=True,
+    )
 
-    # Table: Summary Table
-    table1_data = create_summary_table(filtered_df, [
-        'Invoice Number', 'Carrier Name', 'Reconciliation Status', 'Invoice Amount (USD)', 
-        'Disputed Amount (USD)', 'Dispute Type', 'Settlement Status'
-    ])
+    with profile_section("charts"):
+        if results['processed_vs_disputed'] is not None:
+            plot_serialized(results['processed_vs_disputed'])
+        plot_serialized(results['monthly_disputes_fig'])
+
+    # Table: Summary Table (invoice-level, so it reads the filtered rows)
+    with profile_section("table"):
+        _, filter_view = apply_filters(data_version, carriers, months)
+        table1_columns = [
+            'Invoice Number', 'Carrier Name', 'Reconciliation Status', 'Invoice Amount (USD)',
+            'Disputed Amount (USD)', 'Dispute Type', 'Settlement Status'
+        ]
+        st.caption(
+            "Invoices are reconciled per carrier and billing cycle against aggregated usage. Every invoice of a "
+            "disputed cycle is In Progress and Unsettled, and its disputed amount is its share (by invoice amount) "
+            "of the cycle's variance, not a finding on that invoice alone."
+        )
+        # Paged from the filter view: only the search/sort columns and the visible page are read
+        paginated_table(
+            filter_view, key="invoice_table", columns=table1_columns, search_columns=['Invoice Number', 'Carrier Name'],
+            highlight={'Settlement Status': SETTLEMENT_STATUS_STYLES}
+        )
+        # Exports every filtered invoice (not just the page), streamed from the filter view
+        export_controls("invoice_table", "invoice_reconciliation", len(filter_view),
+                        lambda chunk_rows: filter_view.iter_chunks(chunk_rows, table1_columns),
+                        (data_version, carriers, months))
 
-    def highlight_settlement_status1(val):
-        """Highlight 'Pending' in red and 'Settled' in green."""
-        if val == 'Unsettled':
-            return 'color: red; font-weight: bold;'
-        elif val == 'Settled':
-            return 'color: green; font-weight: bold;'
-        return ''
 
-    styled_table = table1_data.style.applymap(
-        highlight_settlement_status1, subset=['Settlement Status']
-    ).set_properties(**{'text-align': 'left'})
-    st.dataframe(styled_table, use_container_width=True, height=250)
 
 
+def carrier_cycle_keys(table):
+    """
+    (carrier, billing cycle) labels of a table's rows, for looking up netting results.
+    """
+    return pd.MultiIndex.from_arrays(
+        [table['Carrier Name'].astype(str), table['Billing Cycle'].astype(str)], names=['Participant', 'Billing Cycle']
+    )
 
 
 # Tab 2: Reconciliation Summary
-with tab2:
+@st.cache_data(max_entries=64, show_spinner=False)
+def compute_reconciliation_summary(data_version, carriers, months):
+    import plotly.express as px
+
+    filtered_cube, _ = apply_filters(data_version, carriers, months)
+    results = {}
+
+    # Chart: Pending Reconciliation by Carrier
+    pending_reconciliation = filtered_cube[filtered_cube['Reconciliation Status'] == 'Pending']
+    pending_summary = top_n_with_other(
+        rollup(pending_reconciliation, 'Carrier Name', ['Invoice Amount (USD)']), 'Carrier Name', ['Invoice Amount (USD)']
+    )
+    pending_reconciliation_fig = px.bar(
+        pending_summary,
+        x='Carrier Name',
+        y='Invoice Amount (USD)',
+        title="Pending Reconciliation by Carrier"
+    )
+
+    pending_reconciliation_fig.update_layout(
+        title={
+            'text': "Pending Reconciliation by Carrier",
+            'font': {'size': 24},
+            'x': 0.35
+        }
+    )
+    results['pending_reconciliation_fig'] = serialize_figure(pending_reconciliation_fig)
+
+    # Table: Reconciliation Summary
+    summary_table2 = rollup(filtered_cube, ['Carrier Name', 'Billing Cycle'], ['Invoice Amount (USD)', 'Disputed Amount (USD)'])
+
+    # Receivables, payables and bilateral net against each carrier, and the
+    # carrier's multilateral net position across the whole network, per cycle.
+    # All from our side: a positive Netted Amount or Net Position is paid in by the carrier.
+    netting = load_settlement_netting(data_version)
+    cycle_keys = carrier_cycle_keys(summary_table2)
+    with_carriers = netting.counterparty(OPERATOR).reindex(cycle_keys)
+    summary_table2['Receivables'] = np.round(summary_table2['Invoice Amount (USD)'] - summary_table2['Disputed Amount (USD)'], 2)
+    summary_table2['Payables'] = np.round(with_carriers['Payables'].fillna(0).to_numpy(), 2)
+    summary_table2['Netted Amount'] = np.round(summary_table2['Receivables'] - summary_table2['Payables'], 2)
+    summary_table2['Net Position'] = np.round(
+        -netting.positions['Net Position (USD)'].reindex(cycle_keys).fillna(0).to_numpy(), 2
+    )
+    # Settlement follows reconciliation, which is per (carrier, cycle): a cycle is settled once reconciled undisputed
+    unsettled = rollup(
+        filtered_cube.assign(Unsettled=filtered_cube['Invoice Count'].where(filtered_cube['Settlement Status'] == 'Unsettled', 0)),
+        ['Carrier Name', 'Billing Cycle'], ['Unsettled']
+    )
+    summary_table2['Settlement Status'] = np.where(unsettled['Unsettled'].to_numpy() > 0, 'Unsettled', 'Settled')
+
+    results['summary_table2'] = summary_table2
+    return results
+
+
+def render_reconciliation_summary(data_version, carriers, months):
+    with profile_section("compute"):
+        results = compute_reconciliation_summary(data_version, carriers, months)
+    with profile_section("counters"):
+        kpis = compute_kpi_snapshot(data_version, carriers, months)
     st.subheader("Reconciliation Summary")
-    
-    # Counter: Current Billing Cycle
-    current_cycle_data = filtered_df[filtered_df['Billing Cycle'] == filtered_df['Billing Cycle'].max()]
-    current_cycle_data['Receivables'] = np.round(np.random.uniform(2000, 10000, len(current_cycle_data)), 2)
-    current_cycle_count = len(current_cycle_data[current_cycle_data['Reconciliation Status'] == 'Pending'])
-    current_cycle_amount = current_cycle_data[current_cycle_data['Reconciliation Status'] == 'Pending']['Receivables'].sum()
-    
-    # Counter: Quarter to Date (QTD)
-    current_quarter = pd.Timestamp.now().quarter
-    qtd_data = filtered_df[filtered_df['Billing Cycle'].apply(lambda x: pd.Timestamp(x).quarter) == current_quarter]
-    qtd_data['Receivables'] = np.round(np.random.uniform(5000, 15000, len(qtd_data)), 2)
-    qtd_cycle_count = len(qtd_data[qtd_data['Reconciliation Status'] == 'Pending'])
-    qtd_cycle_amount = qtd_data[qtd_data['Reconciliation Status'] == 'Pending']['Receivables'].sum()
-
-    
+
 # Clickable Counters using st.components.v1.html
     components.html(
         f"""
         <div style="display: flex; justify-content: center; gap: 40px; margin: 20px;">
             <!-- Current Billing Cycle -->
             <a style="text-decoration: none;">
-                <div style="text-align: center; padding: 15px; width: 250px; 
-                            border: 2px solid #6C63FF; border-radius: 12px; 
-                            background: linear-gradient(135deg, #A3ABFF, #ECECFF); 
+                <div style="text-align: center; padding: 15px; width: 250px;
+                            border: 2px solid #6C63FF; border-radius: 12px;
+                            background: linear-gradient(135deg, #A3ABFF, #ECECFF);
                             box-shadow: 0px 4px 8px rgba(0, 0, 0, 0.1); transition: transform 0.2s ease;">
                     <h5 style="color: #6C63FF; margin: 0; font-size: 1.2em;">🔴 Unreconciled (Current)</h5>
                     <p style="margin: 10px 0; color: #2B55CC; font-size: 1.5em; font-weight: bold;">
-                        {current_cycle_count} Invoices
+                        {kpis.current_cycle_pending_invoices} Invoices
                     </p>
                     <p style="margin: 5px 0; color: #555; font-size: 1.1em;">
-                        Receivables: <span style="color: #2B55CC; font-weight: bold;">${current_cycle_amount:,.2f}</span>
+                        Receivables: <span style="color: #2B55CC; font-weight: bold;">${kpis.current_cycle_pending_receivables:,.2f}</span>
                     </p>
                 </div>
             </a>
 
             <!-- Quarter-to-Date -->
             <a style="text-decoration: none;">
-                <div style="text-align: center; padding: 15px; width: 250px; 
-                            border: 2px solid #FF6B6B; border-radius: 12px; 
-                            background: linear-gradient(135deg, #FFA3A3, #FFECEC); 
+                <div style="text-align: center; padding: 15px; width: 250px;
+                            border: 2px solid #FF6B6B; border-radius: 12px;
+                            background: linear-gradient(135deg, #FFA3A3, #FFECEC);
                             box-shadow: 0px 4px 8px rgba(0, 0, 0, 0.1); transition: transform 0.2s ease;">
                     <h5 style="color: #FF6B6B; margin: 0; font-size: 1.2em;">🔴 Unreconciled (QTD)</h5>
                     <p style="margin: 10px 0; color: #CC2B2B; font-size: 1.5em; font-weight: bold;">
-                        {qtd_cycle_count} Invoices
+                        {kpis.qtd_pending_invoices} Invoices
                     </p>
                     <p style="margin: 5px 0; color: #555; font-size: 1.1em;">
-                        Receivables: <span style="color: #CC2B2B; font-weight: bold;">${qtd_cycle_amount:,.2f}</span>
+                        Receivables: <span style="color: #CC2B2B; font-weight: bold;">${kpis.qtd_pending_receivables:,.2f}</span>
                     </p>
                 </div>
             </a>
@@ -261,92 +321,81 @@ with tab2:
         height=150,  # Adjust height as necessary
     )
 
+    with profile_section("charts"):
+        plot_serialized(results['pending_reconciliation_fig'])
 
-    # Chart: Pending Reconciliation by Carrier
-    pending_reconciliation = filtered_df[filtered_df['Reconciliation Status'] == 'Pending']
-    pending_summary = pending_reconciliation.groupby('Carrier Name')['Invoice Amount (USD)'].sum().reset_index()
-    pending_reconciliation_fig = px.bar(
-        pending_summary, 
-        x='Carrier Name', 
-        y='Invoice Amount (USD)',
-        title="Pending Reconciliation by Carrier"
-    )
-
-    pending_reconciliation_fig.update_layout(
-        title={
-            'text': "Pending Reconciliation by Carrier",
-            'font': {'size': 24},
-            'x': 0.35
-        }
-    )
-    st.plotly_chart(pending_reconciliation_fig)
-
-    # Table: Reconciliation Summary
-    filtered_df['Receivables'] = np.round(filtered_df['Invoice Amount (USD)'] - filtered_df['Disputed Amount (USD)'], 2)
-    filtered_df['Payables'] = np.round(filtered_df['Disputed Amount (USD)'], 2)
-
-    summary_table2 = filtered_df.groupby(['Carrier Name', 'Billing Cycle']).agg({
-        'Invoice Amount (USD)': 'sum',
-        'Disputed Amount (USD)': 'sum',
-    }).reset_index()
+    with profile_section("table"):
+        paginated_table(
+            results['summary_table2'], key="reconciliation_table", search_columns=['Carrier Name', 'Billing Cycle'],
+            highlight={'Settlement Status': SETTLEMENT_STATUS_STYLES}
+        )
+        export_controls("reconciliation_table", "reconciliation_summary", len(results['summary_table2']),
+                        frame_chunks(results['summary_table2']), (data_version, carriers, months))
 
-    summary_table2['Receivables'] = current_cycle_data['Receivables']
-    summary_table2['Payables'] = np.round(np.random.uniform(500, 2500, len(summary_table2)), 2)
-    summary_table2['Netted Amount'] = np.round(summary_table2['Receivables'] - summary_table2['Payables'], 2)
-    summary_table2['Settlement Status'] = np.random.choice(['Settled', 'Pending'], len(summary_table2))
 
-    summary_table2_rounded = summary_table2.round(2)
-    summary_table2_display = summary_table2_rounded.astype(str)
+# Tab 3: Dispute Summary
+@st.cache_data(max_entries=64, show_spinner=False)
+def compute_dispute_summary(data_version, carriers, months):
+    import plotly.express as px
 
-    def highlight_settlement_status1(val):
-        if val == 'Pending':
-            return 'color: red; font-weight: bold;'
-        elif val == 'Settled':
-            return 'color: green; font-weight: bold;'
-        return ''
+    filtered_cube, _ = apply_filters(data_version, carriers, months)
+    results = {}
 
-    styled_table = summary_table2_display.style.applymap(highlight_settlement_status1, subset=['Settlement Status']).set_properties(**{'text-align': 'left'})
-    st.dataframe(styled_table, use_container_width=True, height=250)
+    # Chart 1: Disputed Amounts by Carrier
+    disputed_amounts = top_n_with_other(
+        rollup(filtered_cube, 'Carrier Name', ['Disputed Amount (USD)']), 'Carrier Name', ['Disputed Amount (USD)']
+    )
+    results['disputed_amounts_fig'] = serialize_figure(px.bar(
+        disputed_amounts, x='Carrier Name', y='Disputed Amount (USD)',
+        title="Disputed Amounts by Carrier"
+    ))
 
+    # Chart 2: Disputed Usage by Carrier
+    disputed_usage = top_n_with_other(
+        rollup(filtered_cube, 'Carrier Name', ['Disputed Usage (Mins)']), 'Carrier Name', ['Disputed Usage (Mins)']
+    )
+    results['disputed_usage_fig'] = serialize_figure(px.bar(
+        disputed_usage, x='Carrier Name', y='Disputed Usage (Mins)',
+        title="Disputed Usage by Carrier"
+    ))
 
-# Tab 3: Dispute Summary
-with tab3:
+    # Group by 'Carrier Name' and create the summary table
+    summary_table3 = rollup(filtered_cube, 'Carrier Name', ['Invoice Amount (USD)', 'Disputed Amount (USD)', 'Disputed Usage (Mins)'])
+    for col in ['Dispute Type', 'Settlement Status']:
+        modes = group_mode(filtered_cube['Carrier Name'], filtered_cube[col], weights=filtered_cube['Invoice Count'])
+        summary_table3[col] = modes.reindex(summary_table3['Carrier Name']).to_numpy()
+    results['summary_table3'] = summary_table3
+    return results
+
+
+def render_dispute_summary(data_version, carriers, months):
+    with profile_section("compute"):
+        results = compute_dispute_summary(data_version, carriers, months)
+    with profile_section("counters"):
+        kpis = compute_kpi_snapshot(data_version, carriers, months)
     st.subheader("Dispute Summary")
 
-    # Ensure 'Disputed Usage (Mins)' is added to the filtered dataframe
-    if 'Disputed Usage (Mins)' not in filtered_df.columns:
-        filtered_df['Disputed Usage (Mins)'] = np.random.uniform(0, 500, size=len(filtered_df)).round(2)
-        filtered_df.loc[filtered_df['Dispute Type'] == 'Rate Dispute', 'Disputed Usage (Mins)'] = np.random.uniform(0, 5000, size=len(filtered_df[filtered_df['Dispute Type'] == 'Rate Dispute'])).round(2)
-        filtered_df.loc[filtered_df['Dispute Type'] == 'Volume Dispute', 'Disputed Usage (Mins)'] = np.random.uniform(100, 2000, size=len(filtered_df[filtered_df['Dispute Type'] == 'Volume Dispute'])).round(2)
-
-    if 'Disputed Amount (USD)' not in filtered_df.columns:
-        filtered_df['Disputed Amount (USD)'] = (filtered_df['Disputed Usage (Mins)'] * np.random.uniform(0.05, 0.2, size=len(filtered_df))).round(2)
-
-    # Dispute Count
-    rate_disputes = len(filtered_df[filtered_df['Dispute Type'] == 'Rate Dispute'])
-    volume_disputes = len(filtered_df[filtered_df['Dispute Type'] == 'Volume Dispute'])
-
    # Counters
-    
+
     st.markdown(
-        """
+        f"""
         <div style="display: flex; justify-content: center; gap: 20px;">
-            <div style="text-align: center; padding: 15px; width: 260px; 
-                        border: 2px solid #6C63FF; border-radius: 12px; 
-                        background: linear-gradient(135deg, #A3ABFF, #ECECFF); 
+            <div style="text-align: center; padding: 15px; width: 260px;
+                        border: 2px solid #6C63FF; border-radius: 12px;
+                        background: linear-gradient(135deg, #A3ABFF, #ECECFF);
                         box-shadow: 0px 4px 8px rgba(0, 0, 0, 0.1);">
                 <h5 style="color: #007BFF; margin: 0; font-size: 1.2em;">🔵 Rate Disputes</h5>
                 <p style="margin: 10px 0; color: #2B55CC; font-size: 1.5em; font-weight: bold;">
-                    10 Ongoing
+                    {kpis.ongoing_rate_disputes} Ongoing
                 </p>
             </div>
-            <div style="text-align: center; padding: 15px; width: 260px; 
-                        border: 2px solid #FF5733; border-radius: 12px; 
-                        background: linear-gradient(135deg, #F5B7B1, #FDEDEC); 
+            <div style="text-align: center; padding: 15px; width: 260px;
+                        border: 2px solid #FF5733; border-radius: 12px;
+                        background: linear-gradient(135deg, #F5B7B1, #FDEDEC);
                         box-shadow: 0px 4px 8px rgba(0, 0, 0, 0.1);">
                 <h5 style="color: #FF5733; margin: 0; font-size: 1.2em;">🔴 Volume Disputes</h5>
                 <p style="margin: 10px 0; color: #C70039; font-size: 1.5em; font-weight: bold;">
-                    5 Ongoing
+                    {kpis.ongoing_volume_disputes} Ongoing
                 </p>
             </div>
         </div>
@@ -356,108 +405,135 @@ with tab3:
 
 
     # Create two columns for side-by-side charts
-    col1, col2 = st.columns(2)
-
-    # Chart 1: Disputed Amounts by Carrier
-    with col1:
-        disputed_amounts = filtered_df.groupby('Carrier Name')['Disputed Amount (USD)'].sum().reset_index()
-        disputed_amounts_fig = px.bar(
-            disputed_amounts, x='Carrier Name', y='Disputed Amount (USD)', 
-            title="Disputed Amounts by Carrier"
-        )
-        st.plotly_chart(disputed_amounts_fig, use_container_width=True)
+    with profile_section("charts"):
+        col1, col2 = st.columns(2)
+        with col1:
+            plot_serialized(results['disputed_amounts_fig'], use_container_width=True)
+        with col2:
+            plot_serialized(results['disputed_usage_fig'], use_container_width=True)
 
-    # Chart 2: Disputed Usage by Carrier
-    with col2:
-        disputed_usage = filtered_df.groupby('Carrier Name')['Disputed Usage (Mins)'].sum().reset_index()
-        disputed_usage_fig = px.bar(
-            disputed_usage, x='Carrier Name', y='Disputed Usage (Mins)', 
-            title="Disputed Usage by Carrier"
-        )
-        st.plotly_chart(disputed_usage_fig, use_container_width=True)
-
-     # Ensure 'Disputed Usage (Mins)' is added to the filtered dataframe
-    if 'Disputed Usage (Mins)' not in filtered_df.columns:
-        filtered_df['Disputed Usage (Mins)'] = np.random.uniform(0, 500, size=len(filtered_df)).round(2)
-        filtered_df.loc[filtered_df['Dispute Type'] == 'Rate Dispute', 'Disputed Usage (Mins)'] = np.random.uniform(0, 5000, size=len(filtered_df[filtered_df['Dispute Type'] == 'Rate Dispute'])).round(2)
-        filtered_df.loc[filtered_df['Dispute Type'] == 'Volume Dispute', 'Disputed Usage (Mins)'] = np.random.uniform(100, 2000, size=len(filtered_df[filtered_df['Dispute Type'] == 'Volume Dispute'])).round(2)
+    with profile_section("table"):
+        paginated_table(results['summary_table3'], key="dispute_table", search_columns=['Carrier Name'])
+        export_controls("dispute_table", "dispute_summary", len(results['summary_table3']),
+                        frame_chunks(results['summary_table3']), (data_version, carriers, months))
 
-    if 'Disputed Amount (USD)' not in filtered_df.columns:
-        filtered_df['Disputed Amount (USD)'] = (filtered_df['Disputed Usage (Mins)'] * np.random.uniform(0.05, 0.2, size=len(filtered_df))).round(2)
 
-    # Dispute Count
-    rate_disputes = len(filtered_df[filtered_df['Dispute Type'] == 'Rate Dispute'])
-    volume_disputes = len(filtered_df[filtered_df['Dispute Type'] == 'Volume Dispute'])
-
-    # Group by 'Carrier Name' and create the summary table
-    summary_table3 = filtered_df.groupby('Carrier Name').agg({
-        'Invoice Amount (USD)': 'sum',
-        'Disputed Amount (USD)': 'sum',
-        'Disputed Usage (Mins)': 'sum',
-        'Dispute Type': lambda x: x.mode()[0] if not x.mode().empty else None,  # Fix here
-        'Settlement Status': lambda x: x.mode()[0] if not x.mode().empty else None  # Similarly handle empty modes
-    }).reset_index()
+# Tab 4: Settlement Summary
+@st.cache_data(max_entries=64, show_spinner=False)
+def compute_settlement_summary(data_version, carriers, months):
+    import plotly.express as px
 
-    st.dataframe(summary_table3, use_container_width=True, height=250)
+    filtered_cube, _ = apply_filters(data_version, carriers, months)
+    results = {}
 
+    # Group by 'Carrier Name' and aggregate the required fields
+    summary_table4 = rollup(filtered_cube, 'Carrier Name', ['Disputed Amount (USD)', 'Invoice Count'])
 
-# Tab 4: Settlement Summary
-with tab4:
-    st.subheader("Settlement Summary")
+    # Rename 'Invoice Count' to 'Total Invoices' for clarity
+    summary_table4.rename(columns={'Invoice Count': 'Total Invoices'}, inplace=True)
 
-    # Group by 'Carrier Name' and aggregate the required fields
-    summary_table4 = filtered_df.groupby('Carrier Name').agg({
-        'Disputed Amount (USD)': 'sum',  # Summing disputed amounts per carrier
-        'Settlement Status': 'count',  # Counting the invoices (total invoices per carrier)
-    }).reset_index()
-
-    # Rename 'Settlement Status' to 'Total Invoices' for clarity
-    summary_table4.rename(columns={'Settlement Status': 'Total Invoices'}, inplace=True)
-
-    # Define meaningful values based on telecom billing scenarios
-    summary_table4['Settled Invoices'] = summary_table4.apply(
-        lambda row: row['Total Invoices'] - np.random.randint(1, 3), axis=1
-    )  # Randomly settled invoices
+    # Settled vs pending invoices per carrier from the settlement status counts
+    settlement_counts = status_counts(
+        filtered_cube['Carrier Name'], filtered_cube['Settlement Status'], weights=filtered_cube['Invoice Count']
+    ).reindex(summary_table4['Carrier Name'])
+    summary_table4['Settled Invoices'] = settlement_counts['Settled'].to_numpy(dtype=np.int64)
     summary_table4['Pending Settlements'] = summary_table4['Total Invoices'] - summary_table4['Settled Invoices']
 
     # Total Settled Amount: Assuming 80% of the disputed amount is settled
     summary_table4['Total Settled Amount'] = np.round(summary_table4['Disputed Amount (USD)'] * 0.8, 2)
 
-    # Outstanding Amount: Remaining amount (20% of disputed amounts)
-    summary_table4['Outstanding Amount'] = np.round(summary_table4['Disputed Amount (USD)'] * 0.2, 2)
+    # Net Position: the carrier's multilateral net over the selected cycles, from our side as in
+    # the Reconciliation Summary (positive = paid in by the carrier);
+    # Outstanding Amount: what it still has to pay in after netting, cycle by cycle
+    carrier_cycles = rollup(filtered_cube, ['Carrier Name', 'Billing Cycle'], ['Invoice Count'])
+    positions = load_settlement_netting(data_version).positions['Net Position (USD)']
+    carrier_cycles['Net Position'] = -positions.reindex(carrier_cycle_keys(carrier_cycles)).fillna(0).to_numpy()
+    carrier_cycles['Outstanding Amount'] = np.clip(carrier_cycles['Net Position'], 0, None)
+    netted = carrier_cycles.groupby('Carrier Name', observed=True)[['Net Position', 'Outstanding Amount']].sum()
+    summary_table4['Net Position'] = np.round(netted['Net Position'].reindex(summary_table4['Carrier Name']).to_numpy(), 2)
+    summary_table4['Outstanding Amount'] = np.round(
+        netted['Outstanding Amount'].reindex(summary_table4['Carrier Name']).to_numpy(), 2
+    )
 
     # Settlement Completion Rate: Ratio of settled invoices to total invoices
-    summary_table4['Settlement Completion Rate'] = np.round(
-        (summary_table4['Settled Invoices'] / summary_table4['Total Invoices']) * 100, 2
-    )
+    summary_table4['Settlement Completion Rate'] = ratio(summary_table4['Settled Invoices'], summary_table4['Total Invoices'])
 
     # Settlement Adjustment: Simulated random adjustments
     summary_table4['Settlement Adjustment'] = np.round(np.random.uniform(0, 500, len(summary_table4)), 2)
 
-    # Calculate total pending settlements and disputed amount
-    total_pending_settlements = summary_table4['Pending Settlements'].sum()
-    total_disputed_amount = summary_table4['Disputed Amount (USD)'].sum()
+    # Chart 1: Settlement Status by Carrier (Pie Chart)
+    settlement_status = rollup(filtered_cube, 'Settlement Status', ['Invoice Count']).rename(columns={'Invoice Count': 'Count'})
+    settlement_pie = px.pie(
+        settlement_status, names='Settlement Status', values='Count', title="Overall Settlement Status"
+    )
+    settlement_pie.update_layout(
+        title={
+            'text': "Overall Settlement Status",
+            'font': {'size': 24},  # Increase font size
+            'x': 0.25  # Center title
+        }
+    )
+    results['settlement_pie'] = serialize_figure(settlement_pie)
+
+    # Chart 2: Outstanding Amount by Carrier (Bar Chart)
+    outstanding_bar = px.bar(
+        top_n_with_other(summary_table4, 'Carrier Name', ['Outstanding Amount']),
+        x='Carrier Name',
+        y='Outstanding Amount',
+        title="Outstanding Amount by Carrier",
+        text='Outstanding Amount',
+        labels={'Outstanding Amount': 'Amount (USD)'},
+        color='Outstanding Amount',
+        color_continuous_scale='Reds'
+    )
+    outstanding_bar.update_traces(
+        texttemplate='%{text:.2f}',  # Format text to 2 decimal places
+        textposition='outside',     # Position text outside bars
+        textangle=0                 # Horizontal text
+    )
+    outstanding_bar.update_layout(
+        title={
+            'text': "Outstanding Amount by Carrier",
+            'font': {'size': 24},  # Increase font size
+            'x': 0.25  # Center title
+        },
+        xaxis_title="Carrier Name",
+        yaxis_title="Outstanding Amount (USD)",
+        template="plotly_white"
+    )
+    results['outstanding_bar'] = serialize_figure(outstanding_bar)
+
+    results['summary_table4'] = summary_table4
+    return results
+
+
+def render_settlement_summary(data_version, carriers, months):
+    with profile_section("compute"):
+        results = compute_settlement_summary(data_version, carriers, months)
+    with profile_section("counters"):
+        kpis = compute_kpi_snapshot(data_version, carriers, months)
+    st.subheader("Settlement Summary")
 
     # Add counters for Total Pending Settlements and Total Disputed Amount
     st.markdown(
         f"""
         <div style="display: flex; justify-content: center; gap: 20px; margin: 20px;">
-            <div style="text-align: center; padding: 15px; width: 270px; 
-                        border: 2px solid #6C63FF; border-radius: 12px; 
-                        background: linear-gradient(135deg, #A3ABFF, #ECECFF); 
+            <div style="text-align: center; padding: 15px; width: 270px;
+                        border: 2px solid #6C63FF; border-radius: 12px;
+                        background: linear-gradient(135deg, #A3ABFF, #ECECFF);
                         box-shadow: 0px 4px 8px rgba(0, 0, 0, 0.1); transition: transform 0.2s ease;">
                 <h5 style="color: #007BFF; margin: 0; font-size: 1.2em;">🔵 Unsettled Invoices</h5>
                 <p style="margin: 10px 0; color: #2B55CC; font-size: 1.5em; font-weight: bold;">
-                    {total_pending_settlements}
+                    {kpis.unsettled_invoices}
                 </p>
             </div>
-            <div style="text-align: center; padding: 15px; width: 270px; 
-                        border: 2px solid #FF5733; border-radius: 12px; 
-                        background: linear-gradient(135deg, #F5B7B1, #FDEDEC); 
+            <div style="text-align: center; padding: 15px; width: 270px;
+                        border: 2px solid #FF5733; border-radius: 12px;
+                        background: linear-gradient(135deg, #F5B7B1, #FDEDEC);
                         box-shadow: 0px 4px 8px rgba(0, 0, 0, 0.1); transition: transform 0.2s ease;">
                 <h5 style="color: #FF5733; margin: 0; font-size: 1.2em;">🔴 Unsettled Amount </h5>
                 <p style="margin: 10px 0; color: #C70039; font-size: 1.5em; font-weight: bold;">
-                    ${total_disputed_amount:,.2f}
+                    ${kpis.total_disputed_amount:,.2f}
                 </p>
             </div>
         </div>
@@ -467,57 +543,90 @@ with tab4:
 
 
     # Create columns for the two charts
-    col1, col2 = st.columns(2)
+    with profile_section("charts"):
+        col1, col2 = st.columns(2)
+        with col1:
+            plot_serialized(results['settlement_pie'], use_container_width=True)
+        with col2:
+            plot_serialized(results['outstanding_bar'], use_container_width=True)
 
-    # Chart 1: Settlement Status by Carrier (Pie Chart)
-    with col1:
-        settlement_status = filtered_df.groupby(['Carrier Name', 'Settlement Status']).size().reset_index(name='Count')
-        settlement_pie = px.pie(
-            settlement_status, names='Settlement Status', values='Count', title="Overall Settlement Status"
-        )
-        settlement_pie.update_layout(
-            title={
-                'text': "Overall Settlement Status",
-                'font': {'size': 24},  # Increase font size
-                'x': 0.25  # Center title
-            }
-        )
-        st.plotly_chart(settlement_pie, use_container_width=True)
+    # Display the summary table below the charts
+    with profile_section("table"):
+        paginated_table(results['summary_table4'], key="settlement_table", search_columns=['Carrier Name'])
+        export_controls("settlement_table", "settlement_summary", len(results['summary_table4']),
+                        frame_chunks(results['summary_table4']), (data_version, carriers, months))
 
-    # Chart 2: Outstanding Amount by Carrier (Bar Chart)
-    with col2:
-        outstanding_bar = px.bar(
-            summary_table4,
-            x='Carrier Name',
-            y='Outstanding Amount',
-            title="Outstanding Amount by Carrier",
-            text='Outstanding Amount',
-            labels={'Outstanding Amount': 'Amount (USD)'},
-            color='Outstanding Amount',
-            color_continuous_scale='Reds'
-        )
-        outstanding_bar.update_traces(
-            texttemplate='%{text:.2f}',  # Format text to 2 decimal places
-            textposition='outside',     # Position text outside bars
-            textangle=0                 # Horizontal text
-        )
-        outstanding_bar.update_layout(
-            title={
-                'text': "Outstanding Amount by Carrier",
-                'font': {'size': 24},  # Increase font size
-                'x': 0.25  # Center title
-            },
-            xaxis_title="Carrier Name",
-            yaxis_title="Outstanding Amount (USD)",
-            template="plotly_white"
-        )
-        st.plotly_chart(outstanding_bar, use_container_width=True)
 
-    # Display the summary table below the charts
-    summary_table4_rounded = summary_table4.round(2)
-    summary_table4_display = summary_table4_rounded.astype(str)
-    st.dataframe(
-        summary_table4_display.style.set_properties(**{'text-align': 'center'}), 
-        use_container_width=True, 
-        height=250
-    )
+TABS = {
+    "Invoice Reconciliation": render_invoice_reconciliation,
+    "Reconciliation Summary": render_reconciliation_summary,
+    "Dispute Summary": render_dispute_summary,
+    "Settlement Summary": render_settlement_summary,
+}
+
+
+@st.fragment(run_every=REFRESH_SECONDS)
+def watch_data_version(data_version, worker):
+    """
+    Rerun the page once the refresh worker has published a newer data version.
+
+    Runs on its own timer, so open sessions pick up new data without any user
+    interaction and without rerunning the rest of the page in between.
+    """
+    if current_data_version() != data_version:
+        st.rerun()
+    status = worker.status
+    for name, error in status['quarantined']:
+        st.warning(f"Skipped invoice file {name} after {REFRESH_MAX_ATTEMPTS} failed attempts: {error}")
+    if status['error']:
+        st.caption(f"Data refresh failed: {status['error']}")
+    elif status['last_refresh']:
+        refreshed = pd.Timestamp(status['last_refresh'], unit='s').strftime('%Y-%m-%d %H:%M:%S')
+        st.caption(f"Data refreshed {refreshed} UTC (+{status['rows']:,} invoices)")
+
+
+# Opt-in per-section timings (?profile=1 or BILLING_PROFILE=1), rendered at the end of the run;
+# profiling is released even when the run raises or is rerun
+with profiled_run():
+    # Background polling for new invoices (BILLING_REFRESH_SOURCE), shared by all sessions
+    refresh_worker = start_refresh_worker()
+
+    # Shared, read-only filter index (built once per data version for all sessions)
+    with profile_section("data"):
+        data_version = current_data_version()
+        filter_index = get_filter_index()
+
+
+    # Dashboard title
+    st.title("Billing Reconciliation Dashboard")
+    if refresh_worker is not None:
+        watch_data_version(data_version, refresh_worker)
+
+    # Filters (an empty selection means "All")
+    with profile_section("filters"):
+        carrier_options = list(filter_index.values['Carrier Name'])
+        month_options = list(filter_index.values['Invoice Month'])
+        filter_col1, filter_col2 = st.columns(2)
+        with filter_col1:
+            carrier_filter = st.multiselect("Select Carriers (Optional)", options=carrier_options)
+        with filter_col2:
+            month_filter = st.multiselect("Select Months (Optional)", options=month_options)
+        month_range = st.select_slider("Month Range", options=month_options, value=(month_options[0], month_options[-1]))
+
+        # Combine the month multiselect and range into one month selection
+        selected_months = None
+        if month_filter or month_range != (month_options[0], month_options[-1]):
+            selected_months = filter_index.values_between('Invoice Month', *month_range)
+            if month_filter:
+                selected_months = [month for month in selected_months if month in month_filter]
+
+        # Filter state as hashable labels (None = "All") so tab results can be memoized on it
+        carriers = tuple(carrier_filter) if carrier_filter else None
+        months = None if selected_months is None else tuple(str(month) for month in selected_months)
+
+    # Tabs: only the selected one is computed and rendered
+    active_tab = st.radio("View", list(TABS), horizontal=True, key="active_tab", label_visibility="collapsed")
+    set_profile_context(view=active_tab, carriers=None if carriers is None else len(carriers),
+                        months=None if months is None else len(months))
+    with profile_section(active_tab):
+        TABS[active_tab](data_version, carriers, months)
@@ -0,0 +1,132 @@
+import numpy as np
+import pandas as pd
+import streamlit as st
+
+
+PAGE_SIZES = [25, 50, 100, 250]
+
+# Display formats applied client-side, so the data keeps its numeric dtypes
+CURRENCY_FORMAT = "%.2f"
+
+
+def _search_mask(data, columns, text):
+    """
+    Case-insensitive substring match over `columns`, evaluated per distinct
+    value for categoricals instead of per row.
+    """
+    mask = np.zeros(len(data), dtype=bool)
+    for col in columns:
+        values = data[col]
+        if isinstance(values.dtype, pd.CategoricalDtype):
+            hits = values.cat.categories.astype(str).str.contains(text, case=False, regex=False)
+            lookup = np.append(np.asarray(hits), False)  # code -1 (missing) never matches
+            mask |= lookup[values.cat.codes.to_numpy()]
+        else:
+            if not pd.api.types.is_string_dtype(values.dtype):
+                values = values.astype(str)
+            mask |= values.str.contains(text, case=False, regex=False).fillna(False).to_numpy(dtype=bool)
+    return mask
+
+
+def _read(data, columns):
+    """
+    `columns` of every row of a DataFrame or a filter view; a view reads only those columns.
+    """
+    return data[columns] if isinstance(data, pd.DataFrame) else data.frame(columns)
+
+
+def _sort_key(values):
+    if isinstance(values.dtype, pd.CategoricalDtype):
+        codes = values.cat.codes.to_numpy().astype(np.float64)
+        codes[codes < 0] = np.nan  # code -1 is a missing value
+        return codes
+    if pd.api.types.is_numeric_dtype(values.dtype):
+        return values.to_numpy()
+    return None
+
+
+def page_positions(data, sort_column, ascending, start, stop):
+    """
+    Row positions for rows [start, stop) of `data` sorted by `sort_column`.
+
+    Numeric and categorical columns use a partial sort (argpartition) so only
+    the rows up to the requested page are fully ordered.
+    """
+    n = len(data)
+    if sort_column is None:
+        return np.arange(start, min(stop, n))
+    key = _sort_key(data[sort_column])
+    if key is None:
+        # pandas orders mixed objects with missing values (e.g. None) last instead of failing to compare them
+        values = data[sort_column].reset_index(drop=True)
+        order = values.sort_values(ascending=ascending, kind='stable', na_position='last').index.to_numpy()
+        return order[start:stop]
+    key = key.astype(np.float64) if ascending else -key.astype(np.float64)
+    key[np.isnan(key)] = np.inf  # missing values last in both directions, like the object path
+    if stop < n:
+        candidates = np.argpartition(key, stop - 1)[:stop]
+        return candidates[np.argsort(key[candidates], kind='stable')][start:stop]
+    return np.argsort(key, kind='stable')[start:stop]
+
+
+def paginated_table(data, key, search_columns=None, highlight=None, number_formats=None, height=250, columns=None):
+    """
+    Render `data` one page at a time with server-side search, sort and paging.
+
+    `data` is a DataFrame or a filter view (FilterView, ParquetView); from a
+    view only the search and sort columns and the visible page are read.
+    Only the visible window is styled and sent to the browser.
+    `columns` picks the columns shown (default all); `highlight` maps a
+    column to {value: css}; `number_formats` maps a column to a printf-style
+    format (currency columns default to two decimals).
+    """
+    search_columns = search_columns or []
+    highlight = highlight or {}
+    columns = list(data.columns if columns is None else columns)
+
+    control_cols = st.columns([3, 2, 1, 1])
+    with control_cols[0]:
+        search = st.text_input("Search", key=f"{key}_search", placeholder="Filter rows...") if search_columns else ""
+    with control_cols[1]:
+        sort_column = st.selectbox("Sort by", options=[None] + columns, key=f"{key}_sort",
+                                   format_func=lambda col: "(original order)" if col is None else col)
+    with control_cols[2]:
+        ascending = st.toggle("Ascending", value=True, key=f"{key}_ascending")
+    with control_cols[3]:
+        page_size = st.selectbox("Rows", options=PAGE_SIZES, index=1, key=f"{key}_page_size")
+
+    # Positions of the rows matching the search (None = every row)
+    rows = None
+    if search:
+        rows = np.flatnonzero(_search_mask(_read(data, search_columns), search_columns, search))
+
+    total_rows = len(data) if rows is None else len(rows)
+    page_count = max(1, -(-total_rows // page_size))
+    page = st.number_input(f"Page (of {page_count})", min_value=1, max_value=page_count, value=1, step=1,
+                           key=f"{key}_page_{page_count}")
+    start = (page - 1) * page_size
+    stop = min(start + page_size, total_rows)
+    if sort_column is None:
+        page_rows = np.arange(start, stop)
+    else:
+        sort_values = _read(data, [sort_column])
+        sort_values = sort_values if rows is None else sort_values.iloc[rows]
+        page_rows = page_positions(sort_values, sort_column, ascending, start, stop)
+    page_rows = page_rows if rows is None else rows[page_rows]
+    window = data.iloc[page_rows][columns] if isinstance(data, pd.DataFrame) else data.take(page_rows, columns)
+
+    column_config = {}
+    for col in window.columns:
+        if number_formats and col in number_formats:
+            column_config[col] = st.column_config.NumberColumn(format=number_formats[col])
+        elif pd.api.types.is_float_dtype(window[col].dtype):
+            column_config[col] = st.column_config.NumberColumn(format=CURRENCY_FORMAT)
+
+    styled = window.style.set_properties(**{'text-align': 'left'})
+    for col, styles in highlight.items():
+        if col in window.columns:
+            # Whole-column lookup instead of a Python callback per cell
+            styled = styled.apply(lambda values, styles=styles: values.astype(object).map(styles).fillna(''), subset=[col])
+
+    st.dataframe(styled, use_container_width=True, height=height, hide_index=True, column_config=column_config)
+    st.caption(f"Showing rows {start + 1 if total_rows else 0}-{stop} of {total_rows:,}")
@@ -0,0 +1,33 @@
+import os
+import sys
+import threading
+
+import pytest
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if REPO_ROOT not in sys.path:
+    sys.path.insert(0, REPO_ROOT)
+
+
+@pytest.fixture
+def data_layer(request, monkeypatch, tmp_path):
+    """
+    data_layer on a small synthetic dataset with a fresh version registry.
+
+    Uses the pandas backend unless parametrized indirectly with another one.
+    """
+    import data_layer
+
+    monkeypatch.setattr(data_layer, 'DATASET_CONFIG', {
+        'n_carriers': 4, 'n_months': 3, 'rows_per_carrier': 3, 'dispute_rate': 0.3, 'seed': 7,
+    })
+    monkeypatch.setattr(data_layer, '_VERSION_STATE', {
+        'version': 0, 'lock': threading.Lock(), 'append_lock': threading.Lock(), 'derived': {}, 'built_at': None,
+        'appended': [],
+    })
+    monkeypatch.setattr(data_layer, 'BACKEND', getattr(request, 'param', "pandas"))
+    monkeypatch.setattr(data_layer, 'PARQUET_ROOT', str(tmp_path / "invoice_parquet"))
+    monkeypatch.setattr(data_layer, 'CDR_PATHS', [])
+    monkeypatch.setattr(data_layer, 'SNAPSHOT_PATH', None)
+    monkeypatch.setattr(data_layer, 'DATA_TTL_SECONDS', None)
+    return data_layer
@@ -0,0 +1,84 @@
+import dataclasses
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from cube import CUBE_DIMENSIONS, build_reconciliation_cube
+from data_generator import iter_invoice_chunks
+from filter_index import FilterIndex
+from kpis import compute_kpis
+
+
+def _batch():
+    """
+    Raw invoices for a new carrier ('Carrier 5') and the existing carriers, in billing cycles already loaded.
+    """
+    return next(iter_invoice_chunks(n_carriers=5, n_months=1, rows_per_carrier=2, start_month="2024-02", seed=11))
+
+
+def _sorted_cube(cube):
+    """
+    Cube cells in a fixed order with plain-string dimensions, to compare cubes built different ways.
+    """
+    cube = cube.assign(**{col: cube[col].astype(str) for col in CUBE_DIMENSIONS})
+    cube = cube.assign(**{col: cube[col].astype('float64') for col in cube.columns if col not in CUBE_DIMENSIONS})
+    return cube.sort_values(CUBE_DIMENSIONS, ignore_index=True)
+
+
+@pytest.mark.parametrize('data_layer', ["pandas", "parquet"], indirect=True)
+def test_append_matches_full_rebuild(data_layer):
+    data_layer.load_kpi_accumulator(data_layer.current_data_version())
+    version = data_layer.append_billing_cycle(_batch())
+
+    if data_layer.BACKEND == "parquet":
+        invoices = data_layer._parquet_store(version).rows()
+    else:
+        invoices = data_layer._invoice_data(version)
+    assert len(invoices) == 4 * 3 * 3 + 5 * 2
+    assert 'Carrier 5' in set(invoices['Carrier Name'].astype(str))
+
+    pd.testing.assert_frame_equal(
+        _sorted_cube(data_layer._full_cube(version)), _sorted_cube(build_reconciliation_cube(invoices)),
+        check_exact=False,
+    )
+    appended, rebuilt = data_layer.load_kpi_accumulator(version).snapshot(), compute_kpis(invoices)
+    assert dataclasses.asdict(appended) == pytest.approx(dataclasses.asdict(rebuilt))
+
+    if data_layer.BACKEND == "pandas":
+        index, full = data_layer.load_filter_index(version), FilterIndex(invoices)
+        for col, values in full.values.items():
+            assert list(index.values[col]) == list(values)
+            for value in [*values, None]:
+                np.testing.assert_array_equal(index.positions(col, [value]), full.positions(col, [value]))
+
+
+def test_replay_matches_appended_frame(data_layer):
+    data_layer.load_filter_index(data_layer.current_data_version())
+    appended = data_layer._invoice_data(data_layer.append_billing_cycle(_batch()))
+
+    # A reload (here an explicit invalidation) rebuilds the base data and replays the appended rows
+    replayed = data_layer._invoice_data(data_layer.invalidate_invoice_data())
+    assert replayed is not appended
+    pd.testing.assert_frame_equal(replayed, appended)
+    pd.testing.assert_frame_equal(data_layer._build_invoice_data(1), appended)
+
+
+@pytest.mark.parametrize('data_layer', ["parquet"], indirect=True)
+def test_backends_agree(data_layer, monkeypatch):
+    data_layer.append_billing_cycle(_batch())
+    parquet_version = data_layer.current_data_version()
+    parquet_cube = _sorted_cube(data_layer.query_cube(parquet_version))
+    parquet_kpis = data_layer.load_kpi_accumulator(parquet_version).snapshot()
+    parquet_rows = len(data_layer.load_filter_index(parquet_version).select({'Carrier Name': ['Carrier 5']}))
+
+    monkeypatch.setattr(data_layer, 'BACKEND', "pandas")
+    data_layer._VERSION_STATE.update(version=0, derived={}, built_at=None, appended=[])
+    pandas_version = data_layer.append_billing_cycle(_batch())
+
+    pd.testing.assert_frame_equal(parquet_cube, _sorted_cube(data_layer.query_cube(pandas_version)), check_exact=False)
+    assert dataclasses.asdict(parquet_kpis) == pytest.approx(
+        dataclasses.asdict(data_layer.load_kpi_accumulator(pandas_version).snapshot())
+    )
+    index = data_layer.load_filter_index(pandas_version)
+    assert parquet_rows == len(index.select({'Carrier Name': ['Carrier 5']})) == 2
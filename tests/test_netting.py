@@ -0,0 +1,50 @@
+import pandas as pd
+import pytest
+
+from netting import LEDGER_COLUMNS, SettlementNetting
+
+
+@pytest.fixture
+def netting():
+    # Cycle 1: A owes B 100 (booked as 60 + 40), B owes A 30, B owes C 50, C owes A 20.
+    # Cycle 2: B owes A 10.
+    ledger = pd.DataFrame([
+        ['2024-01-1', 'A', 'B', 60.0],
+        ['2024-01-1', 'A', 'B', 40.0],
+        ['2024-01-1', 'B', 'A', 30.0],
+        ['2024-01-1', 'B', 'C', 50.0],
+        ['2024-01-1', 'C', 'A', 20.0],
+        ['2024-01-2', 'B', 'A', 10.0],
+    ], columns=LEDGER_COLUMNS)
+    return SettlementNetting(ledger)
+
+
+def test_multilateral_positions(netting):
+    positions = netting.positions
+    # Net position = receivable - payable, e.g. A: (30 + 20) - 100
+    expected = {
+        ('A', '2024-01-1'): (50.0, 100.0, -50.0),
+        ('B', '2024-01-1'): (100.0, 80.0, 20.0),
+        ('C', '2024-01-1'): (50.0, 20.0, 30.0),
+        ('A', '2024-01-2'): (10.0, 0.0, 10.0),
+        ('B', '2024-01-2'): (0.0, 10.0, -10.0),
+        ('C', '2024-01-2'): (0.0, 0.0, 0.0),
+    }
+    for key, values in expected.items():
+        assert tuple(positions.loc[key]) == pytest.approx(values)
+    assert positions['Net Position (USD)'].groupby(level='Billing Cycle').sum().abs().max() == pytest.approx(0)
+
+
+def test_bilateral_counterparty(netting):
+    with_a = netting.counterparty('A')
+    assert tuple(with_a.loc[('B', '2024-01-1')]) == pytest.approx((30.0, 100.0, -70.0))
+    assert tuple(with_a.loc[('C', '2024-01-1')]) == pytest.approx((20.0, 0.0, 20.0))
+    assert tuple(with_a.loc[('B', '2024-01-2')]) == pytest.approx((10.0, 0.0, 10.0))
+    assert 'A' not in with_a.index.get_level_values('Participant')
+
+
+def test_efficiency(netting):
+    efficiency = netting.efficiency().set_index('Billing Cycle')
+    # Cycle 1: 200 gross; bilaterally A->B 70, B->C 50, C->A 20; multilaterally B 20 + C 30
+    assert tuple(efficiency.loc['2024-01-1']) == pytest.approx((200.0, 140.0, 50.0))
+    assert tuple(efficiency.loc['2024-01-2']) == pytest.approx((10.0, 10.0, 10.0))